@@ -0,0 +1,64 @@
+"""
+    Helpers shared by the benchmarks.
+"""
+import time
+import argparse
+import numpy
+
+from controllers.webann.ann.layer import Layer, Activation
+from controllers.webann.ann.link import Link
+from controllers.webann.ann.ann import Ann
+
+
+def arguments(doc):
+    """
+        An argument parser with the docstring of the benchmark as its
+        help text.
+    """
+    return argparse.ArgumentParser(description=doc, formatter_class=argparse.RawDescriptionHelpFormatter)
+
+
+def timed(fn, repeat, *args):
+    """
+        Best time of 'repeat' calls of fn(*args), and the result of
+        the last one.
+    """
+    best = None
+    for i in range(repeat):
+        t = time.time()
+        result = fn(*args)
+        t = time.time() - t
+        best = t if best is None else min(best, t)
+    return best, result
+
+
+def chain(sizes, recurrent=False, **kwargs):
+    """
+        Fully connected tanh layers, of the sizes given, after an input
+        layer of sizes[0]. With recurrent set, every hidden layer also
+        gets a full link to itself. The rest of the keyword arguments go
+        to the links. The arcs are not generated yet.
+    """
+    layers = [Layer("Input", sizes[0], io_type='encoder')]
+    for i, n in enumerate(sizes[1:]):
+        io_type = 'decoder' if i == len(sizes) - 2 else None
+        layers.append(Layer("L%i" % (i + 1), n, Activation.sigmoid_tanh, io_type=io_type))
+
+    links = [Link(layers[i], layers[i + 1], 'full', **kwargs) for i in range(len(layers) - 1)]
+
+    if recurrent:
+        links.extend(Link(l, l, 'full', **kwargs) for l in layers[1:-1])
+
+    return Ann(layers, links, [l.name for l in layers])
+
+
+def mlp(sizes, seed, learning_rate=1.0):
+    """
+        An initialised chain with random weights in [-1, 1], drawn
+        from 'seed'.
+    """
+    numpy.random.seed(seed)
+
+    ann = chain(sizes, arc_range=[-1, 1], learning_rate=learning_rate)
+    ann.init_nodes()
+    return ann
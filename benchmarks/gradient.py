@@ -0,0 +1,116 @@
+"""
+    Gradient check of back propagation against finite differences.
+
+    For a tanh network, the weight changes BatchBackprop computes are
+    compared with central differences of the squared error, once with
+    the tanh derivative 1 - a^2 and once with the old 1 - tanh(a)^2,
+    which applied tanh to the activation level a second time. Then both
+    are used to train the same networks, and the time to compute the
+    derivatives of a layer node by node (Layer.derivate) and at once
+    (Layer.derivatives) is measured.
+
+    Run from the top directory with: python -m benchmarks.gradient
+"""
+import numpy
+
+from controllers.webann.ann.layer import Layer, Activation
+from controllers.webann.ann.training import BatchBackprop
+from benchmarks.common import arguments, timed, mlp
+
+
+def old_tanh_derivative(a):
+    return 1 - numpy.tanh(a) ** 2
+
+
+def use_tanh_derivative(derivative):
+    Activation.register(Activation.sigmoid_tanh, numpy.tanh, derivative)
+
+
+def error(ann, inputs, targets):
+    return 0.5 * ((targets - ann.recall_batch(inputs)) ** 2).sum() / len(inputs)
+
+
+def gradient_check(ann, inputs, targets, h=1e-6):
+    """
+        Largest relative difference between the back propagated weight
+        changes and the numerical gradient of the error.
+    """
+    backprop = BatchBackprop(ann, None)
+    changes, sse = backprop.deltas(inputs, targets)
+
+    worst = 0.0
+    for link in ann.links:
+        numeric = numpy.zeros(len(link.current_weights))
+        for i in range(len(numeric)):
+            w = link.current_weights[i]
+
+            link.current_weights[i] = w + h
+            backprop.engine.build_weights()
+            up = error(ann, inputs, targets)
+
+            link.current_weights[i] = w - h
+            backprop.engine.build_weights()
+            down = error(ann, inputs, targets)
+
+            link.current_weights[i] = w
+            numeric[i] = -(up - down) / (2 * h)
+
+        backprop.engine.build_weights()
+        scale = numpy.maximum(abs(numeric) + abs(changes[link]), 1e-12)
+        worst = max(worst, (abs(numeric - changes[link]) / scale).max())
+
+    return worst
+
+
+def train(ann, inputs, targets, epochs):
+    """
+        Incremental training, returns the squared error of the
+        last epoch.
+    """
+    return BatchBackprop(ann, 1).train(inputs, targets, epochs)[-1]
+
+
+def time_derivatives(nodes, repeat):
+    layer = Layer("Hidden", nodes, Activation.sigmoid_tanh)
+    layer.activation_levels[:] = numpy.tanh(numpy.random.randn(nodes))
+
+    per_node = timed(lambda: [layer.derivate(node) for node in layer.nodes], repeat)[0]
+    per_layer = timed(layer.derivatives, repeat)[0]
+
+    return per_node, per_layer
+
+
+if __name__ == "__main__":
+
+    parser = arguments(__doc__)
+    parser.add_argument("--seeds", type=int, default=5, help="Networks to train")
+    parser.add_argument("--epochs", type=int, default=100, help="Epochs to train them")
+    parser.add_argument("--nodes", type=int, nargs="*", default=[10, 100, 1000], help="Layer sizes to time")
+
+    args = parser.parse_args()
+
+    numpy.random.seed(0)
+    inputs = numpy.random.uniform(-1, 1, (20, 4))
+    targets = numpy.random.uniform(-0.8, 0.8, (20, 2))
+
+    derivatives = (("1 - a^2", Activation.sigmoid_tanh_derivative),
+                   ("1 - tanh(a)^2", old_tanh_derivative))
+
+    print "Gradient check, 4-6-2 tanh network"
+    for name, derivative in derivatives:
+        use_tanh_derivative(derivative)
+        print "  %-14s largest relative error %.2e" % (name, gradient_check(mlp((4, 6, 2), 1), inputs, targets))
+
+    print "Squared error after %i epochs, 4-6-2 tanh networks" % args.epochs
+    for name, derivative in derivatives:
+        use_tanh_derivative(derivative)
+        runs = [train(mlp((4, 6, 2), seed, 0.05), inputs, targets, args.epochs) for seed in range(args.seeds)]
+        print "  %-14s %s" % (name, " ".join("%.3f" % r for r in runs))
+
+    use_tanh_derivative(Activation.sigmoid_tanh_derivative)
+
+    print "Derivatives of a tanh layer"
+    print "  %8s %16s %16s %8s" % ("nodes", "per node (ms)", "per layer (ms)", "speedup")
+    for nodes in args.nodes:
+        per_node, per_layer = time_derivatives(nodes, 20)
+        print "  %8i %16.4f %16.4f %7.0fx" % (nodes, per_node * 1000, per_layer * 1000, per_node / per_layer)
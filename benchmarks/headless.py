@@ -0,0 +1,88 @@
+"""
+    The full WebAnn sense-think-act loop without Webots.
+
+    Installs controllers/webann/headless.py as the controller module, and
+    runs the real EpuckBasic and WebAnn in a random 2D arena for a number
+    of ticks, once as it is and once recording what the sensors read.
+    Then the recording is played back as a trace through a network with
+    the same weights, and the wheel speeds of the runs are compared.
+    Prints the ticks per second of every run.
+
+    Run from the top directory with: python -m benchmarks.headless
+"""
+import os
+import time
+import numpy
+
+from controllers.webann import headless
+from benchmarks.common import arguments
+
+
+def controller_class(webann):
+
+    class Controller(webann.WebAnn):
+        """
+            Keeps the wheel speeds set at every tick.
+        """
+
+        def setSpeed(self, left, right):
+            webann.WebAnn.setSpeed(self, left, right)
+            self.history.append(self.speeds)
+
+    return Controller
+
+
+def run(backend, webann, seed):
+    headless.install(backend)
+
+    numpy.random.seed(seed)
+    ini = os.path.join(os.path.dirname(os.path.abspath(webann.__file__)), "ann", "scripts", "ann.ini")
+    ann = webann.AnnParser(ini).create_ann(cache=False)
+
+    controller = controller_class(webann)(ann)
+    controller.history = []
+
+    t = time.time()
+    controller.run()
+    elapsed = time.time() - t
+
+    return controller, elapsed
+
+
+if __name__ == "__main__":
+
+    parser = arguments(__doc__)
+    parser.add_argument("--ticks", type=int, default=5000, help="Timesteps to run")
+    parser.add_argument("--obstacles", type=int, default=8, help="Obstacles in the arena")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the arena and the weights")
+    parser.add_argument("--trace", metavar="FILE", help="Save the recorded trace to FILE (.npz)")
+
+    args = parser.parse_args()
+
+    world = headless.install(headless.World.random(args.obstacles, seed=args.seed, steps=args.ticks))
+
+    from controllers.webann import webann
+
+    live, t_live = run(world, webann, args.seed)
+
+    recorder = headless.Recorder(headless.World.random(args.obstacles, seed=args.seed, steps=args.ticks))
+    recorded, t_recorded = run(recorder, webann, args.seed)
+
+    trace = recorder.trace()
+    if args.trace:
+        trace.save(args.trace)
+
+    replay, t_replay = run(trace, webann, args.seed)
+
+    print
+    print "%10s %8s %10s %14s" % ("backend", "ticks", "time (s)", "ticks per sec")
+    for name, controller, elapsed in (("world", live, t_live), ("recorder", recorded, t_recorded),
+                                      ("trace", replay, t_replay)):
+        ticks = len(controller.history)
+        print "%10s %8i %10.2f %14.0f" % (name, ticks, elapsed, ticks / elapsed)
+
+    print "Robot at (%.3f, %.3f), heading %.2f" % (world.x, world.y, world.heading)
+
+    if not live.history == recorded.history == replay.history:
+        raise AssertionError("The recorded or replayed run gave other wheel speeds")
+    print "Recorded and replayed wheel speeds match"
@@ -0,0 +1,37 @@
+"""
+    Benchmark of the ANN script list parser against eval.
+
+    Writes a weight list and an arc list for a link with 'arcs' arcs
+    the way AnnParser.export does, and times parsing them with
+    parse_array and with the old eval path.
+
+    Run from the top directory with: python -m benchmarks.literal
+"""
+import numpy
+
+from controllers.webann.ann.literal import parse_array
+from benchmarks.common import arguments, timed
+
+
+if __name__ == "__main__":
+
+    parser = arguments(__doc__)
+    parser.add_argument("--arcs", type=int, default=1000000, help="Arcs in the link")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of this many runs")
+
+    args = parser.parse_args()
+
+    numpy.random.seed(0)
+    n = int(numpy.sqrt(args.arcs))
+    weights = str(numpy.random.uniform(-0.1, 0.1, args.arcs).tolist())
+    arcs = str([(i // n, i % n) for i in range(args.arcs)])
+
+    print "%8s %10s %12s %12s %8s" % ("value", "chars", "eval (s)", "parse (s)", "speedup")
+    for name, text in (("weights", weights), ("arcs", arcs)):
+        t_eval, expected = timed(eval, args.repeat, text)
+        t_parse, parsed = timed(parse_array, args.repeat, text)
+
+        if not numpy.array_equal(numpy.asarray(expected), parsed):
+            raise AssertionError("parse_array differs from eval for %s" % name)
+
+        print "%8s %10i %12.4f %12.4f %7.1fx" % (name, len(text), t_eval, t_parse, t_eval / t_parse)
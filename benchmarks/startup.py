@@ -0,0 +1,47 @@
+"""
+    Startup benchmark for large generated networks.
+
+    Builds chains of fully connected layers and times Ann.init_nodes,
+    split into arc generation and Ann.find_link_order.
+
+    Run from the top directory with: python -m benchmarks.startup
+"""
+import time
+
+from benchmarks.common import arguments, chain
+
+
+def time_startup(ann):
+    ann.append_intra_layers()
+    ann.create_encoders_decoders()
+    ann.extract_execution_order()
+
+    t = time.time()
+    for link in ann.links:
+        link.generate_arcs()
+    t_arcs = time.time() - t
+
+    t = time.time()
+    ann.find_link_order()
+    t_order = time.time() - t
+
+    ann.initz = True
+    return t_arcs, t_order
+
+
+if __name__ == "__main__":
+
+    parser = arguments(__doc__)
+    parser.add_argument("--layers", type=int, default=4, help="Number of layers")
+    parser.add_argument("--nodes", type=int, nargs="*", default=[10, 50, 100, 200], help="Nodes per layer")
+    parser.add_argument("--recurrent", action="store_true", help="Add full intra layer links")
+
+    args = parser.parse_args()
+
+    print "%8s %10s %12s %12s" % ("nodes", "arcs", "arcs (s)", "order (s)")
+    for nodes in args.nodes:
+        ann = chain([nodes] * args.layers, args.recurrent)
+        t_arcs, t_order = time_startup(ann)
+        arcs = sum(len(link.arcs) for link in ann.links)
+
+        print "%8i %10i %12.4f %12.4f" % (nodes, arcs, t_arcs, t_order)
@@ -3,7 +3,7 @@ from arc import *
 from node import *
 from link import *
 from functools import partial
-from operator import itemgetter
+import numpy
 
 
 class Ann(object):
@@ -16,6 +16,9 @@ class Ann(object):
         self.execution_order = execution_order
         self.initz = False
 
+        self.engine = None # CompiledAnn, when compiled
+        self.profiler = None # Profiler, when profiling
+
 
     def extract_execution_order(self):
          # Fix execution order. 
@@ -32,6 +35,8 @@ class Ann(object):
         # Find input and output
         self.input_nodes = []
         self.output_nodes = []
+        self.input_layers = []
+        self.output_layers = []
 
         for layer in self.layers:
             if layer.type is None:
@@ -39,15 +44,21 @@ class Ann(object):
 
             if layer.type.lower() == "encoder":
                 self.input_nodes.extend(layer.nodes)
+                self.input_layers.append(layer)
 
             elif layer.type.lower() == "decoder":
                 self.output_nodes.extend(layer.nodes)
+                self.output_layers.append(layer)
 
-    def init_nodes(self):
+    def init_nodes(self, snapshot=None):
+        """
+            Set up the network. With a Snapshot (see snapshot.py), the
+            arcs and weights of the links are read from it instead of
+            being generated.
+        """
 
         if self.initz: # Avoid multiple initializations
             return
-        self.initz = True
 
         self.append_intra_layers()
 
@@ -56,10 +67,19 @@ class Ann(object):
         self.extract_execution_order()
 
         # Generate all arc weights. 
-        for link in self.links:
-            link.generate_arcs()
-
-        self.find_link_order()
+        for i, link in enumerate(self.links):
+            if snapshot is None:
+                link.generate_arcs()
+            else:
+                snapshot.load_link(link, i)
+
+        if snapshot is not None and snapshot.link_order is not None:
+            self.link_order_learn = [self.links[i] for i in snapshot.link_order]
+        else:
+            self.find_link_order()
+
+        # Only when complete, so a failed initialization can be retried
+        self.initz = True
 
     def append_intra_layers(self):
         """
@@ -84,42 +104,84 @@ class Ann(object):
          Used by back propagation. Should be ordered like
          L2 -> L3, L1 -> L2, L0 -> L1
          for a network with topology L0 -> L1 -> L2 -> L3
+
+         Breadth first search from the output layers over the links
+         entering each layer. Every link is visited once, so recurrent
+         and intra layer links do not cause repeated work, and links at
+         the same distance keep the order they are found in.
         """
-        all_arcs = []
-        for l in self.links:
-            all_arcs.extend(l.arcs)
+        self.link_order_learn = []
+        seen = set()
 
-        current = self.output_nodes
-        distance = 0
-        order = {}
-        while all_arcs and current:
+        current = list(self.output_layers)
+        while current:
             next_ = []
+            queued = set()
 
-            for node in current:
+            for layer in current:
+                for link in layer.entering:
+                    if link in seen or not len(link.arcs):
+                        continue
 
-                for link in node.layer.entering:
-
-                    for arc in link.arcs:
-                        if arc in all_arcs:
-                            all_arcs.remove(arc)
-                            next_.append(arc.pre_node)
-                            order[link] = distance
+                    seen.add(link)
+                    self.link_order_learn.append(link)
 
+                    if link.pre_layer not in queued:
+                        queued.add(link.pre_layer)
+                        next_.append(link.pre_layer)
 
             current = next_
-            distance += 1
-
-        # Sort by distance
-        items = sorted(order.items(), key=itemgetter(1))
-        self.link_order_learn = [l for l, i in items]
 
-        # Append other nodes.
+        # Append other links.
         for link in self.links:
-            if link not in self.link_order_learn:
+            if link not in seen:
+                seen.add(link)
                 self.link_order_learn.append(link)
 
 
 
+    def compile(self, incremental=False):
+        """
+            Switch to compiled mode, where recall runs on the
+            vectorized engine instead of the node/arc graph.
+
+            With incremental set, recall only updates the layers whose
+            inputs changed since the last recall (see
+            CompiledAnn.recall_incremental).
+        """
+        from compiled import CompiledAnn
+
+        self.init_nodes()
+        self.engine = CompiledAnn(self, incremental)
+        return self.engine
+
+    def enable_profiling(self):
+        """
+            Start timing layer updates, settling and the learn and backprop
+            steps of every link, in the graph and the compiled engine.
+
+            Returns the Profiler, see profiling.py.
+        """
+        from profiling import Profiler
+        if self.profiler is None:
+            self.profiler = Profiler()
+        return self.profiler
+
+    def disable_profiling(self):
+        """
+            Stop timing. Returns the Profiler with what it recorded.
+        """
+        profiler, self.profiler = self.profiler, None
+        return profiler
+
+    def decompile(self):
+        """
+            Leave compiled mode, keeping the current activation levels.
+        """
+        if self.engine is not None:
+            self.engine.store_levels()
+        self.engine = None
+
     def recall(self, inputs):
         """
             Sets input and update all nodes
@@ -127,24 +189,52 @@ class Ann(object):
             Returns output node values.
         """
         self.init_nodes()
+
+        if self.engine is not None:
+            return self.engine.recall(inputs)
+
         self.set_input(inputs)
 
+        profiler = self.profiler
         for layer in self.execution_order:
-            layer.update()
+            if profiler is None:
+                layer.update()
+            else:
+                start = profiler.clock()
+                layer.update(profiler=profiler)
+                profiler.add_layer(layer, profiler.clock() - start)
 
         return self.get_result()
 
+    def recall_batch(self, inputs):
+        """
+            Recall many input vectors at once. Takes an (N x inputs)
+            array and returns an (N x outputs) array. Every row is
+            recalled from the current state of the network, which is
+            not changed.
+        """
+        self.init_nodes()
+
+        engine = self.engine
+        if engine is None:
+            from compiled import CompiledAnn
+            engine = CompiledAnn(self)
+
+        return engine.recall_batch(inputs)
+
     def reset(self):
         """
             Reset all nodes and arcs in the ANN.
         """
         for layer in self.layers:
-            for node in layer.nodes:
-                node.reset_levels()
+            layer.reset_levels()
 
         for link in self.links:
-            for arc in link.arcs:
-                arc.reset()
+            link.reset()
+
+        if self.engine is not None:
+            self.engine.build_weights()
+            self.engine.load_levels()
 
     def learn(self, inputs):
         """
@@ -153,21 +243,47 @@ class Ann(object):
         """
 
         self.recall(inputs)
+        self._sync_nodes()
 
+        profiler = self.profiler
         for link in self.link_order_learn:
-            link.learn()
-
+            if profiler is None:
+                link.learn()
+            else:
+                start = profiler.clock()
+                link.learn()
+                profiler.add("learn", link, profiler.clock() - start)
+
+        self._sync_weights()
         return self.get_result()
 
     def backprop(self, inputs, targets):
         """Perform one epoch of incremental back propagation learning."""
         self.recall(inputs)
+        self._sync_nodes()
 
+        profiler = self.profiler
         for link in self.link_order_learn:
-            link.backprop(targets, self.output_nodes)
-
+            if profiler is None:
+                link.backprop(targets, self.output_nodes)
+            else:
+                start = profiler.clock()
+                link.backprop(targets, self.output_nodes)
+                profiler.add("backprop", link, profiler.clock() - start)
+
+        self._sync_weights()
         return self.get_result()
 
+    def _sync_nodes(self):
+        # The learning rules read the node levels
+        if self.engine is not None:
+            self.engine.store_levels()
+
+    def _sync_weights(self):
+        # Arc weights changed, the arcs did not, refresh the compiled weights
+        if self.engine is not None:
+            self.engine.build_weights()
+
     def test(self, inputs, targets):
         """
             Test without learning the inputs.
@@ -197,8 +313,14 @@ class Ann(object):
         """
             Set activation level for input nodes.
         """
-        for i, node in enumerate(self.input_nodes):
-            node.activation_level = inputs[i]
+        start = 0
+        for layer in self.input_layers:
+            size = len(layer.nodes)
+            layer.prev_activation_levels[:] = layer.activation_levels
+            layer.activation_levels[:] = inputs[start:start + size]
+            start += size
 
     def get_result(self):
-        return [n.activation_level for n in self.output_nodes]
\ No newline at end of file
+        if not self.output_layers:
+            return []
+        return numpy.concatenate([l.activation_levels for l in self.output_layers]).tolist()
\ No newline at end of file
@@ -9,7 +9,7 @@ class Competitive(Layer):
         inter-layer influences.
     """
 
-    def __init__(self, name, nodes, activation_function=None, neg=-1, pos=1, up=None, down=None, rounds=10):
+    def __init__(self, name, nodes, activation_function=None, neg=-1, pos=1, up=None, down=None, rounds=10, tolerance=0.0):
         """
         Competitive network layers are characterized by neurons that 
         have inhibitory intra-layer effects but either excitatory or 
@@ -67,6 +67,7 @@ class Competitive(Layer):
         # mode, with 10 or more settling rounds often required.
         self.quiescent_mode = True
         self.max_settling = rounds
+        self.settling_tolerance = tolerance
         
 
 class Inhibitory(Layer):
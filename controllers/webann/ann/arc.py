@@ -1,20 +1,83 @@
 
-
 class Arc(object):
+    """
+        A lightweight view of one arc of a Link. The link stores the
+        pre/post node indices and the weights of all its arcs in arrays,
+        and the arc reads and writes its values there.
+    """
 
-    def __init__(self,pre_node, post_node, current_weight = None, link = None):
-        self.pre_node = pre_node
-        self.post_node = post_node
-
-        self.pre_node.outgoing.append(self)
-        self.post_node.incomming.append(self)
+    __slots__ = ('link', 'index')
 
-        self.current_weight = current_weight
-        self.init_weight = current_weight
+    def __init__(self, link, index):
         self.link = link
+        self.index = index
+
+    @property
+    def pre_node(self):
+        return self.link.pre_layer.nodes[self.link.pre_index[self.index]]
+
+    @property
+    def post_node(self):
+        return self.link.post_layer.nodes[self.link.post_index[self.index]]
+
+    @property
+    def current_weight(self):
+        return self.link.current_weights[self.index]
+
+    @current_weight.setter
+    def current_weight(self, value):
+        self.link.current_weights[self.index] = value
+
+    @property
+    def init_weight(self):
+        return self.link.initial_weights[self.index]
+
+    @init_weight.setter
+    def init_weight(self, value):
+        self.link.initial_weights[self.index] = value
+
+    def __eq__(self, other):
+        return isinstance(other, Arc) and self.link is other.link and self.index == other.index
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((id(self.link), self.index))
 
     def reset(self):
         """
             Return the weight to the initial weight.
         """
-        self.current_weight = self.init_weight
\ No newline at end of file
+        self.current_weight = self.init_weight
+
+
+class ArcList(object):
+    """
+        Sequence of the arcs of a link. Arc views are created on access,
+        so no per arc objects are kept around.
+    """
+
+    __slots__ = ('link',)
+
+    def __init__(self, link):
+        self.link = link
+
+    def __len__(self):
+        return len(self.link.current_weights)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [Arc(self.link, i) for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("arc index out of range")
+
+        return Arc(self.link, index)
+
+    def __iter__(self):
+        link = self.link
+        for i in xrange(len(self)):
+            yield Arc(link, i)
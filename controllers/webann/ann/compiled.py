@@ -0,0 +1,420 @@
+import numpy
+from layer import Activation
+
+
+class CompiledLayer(object):
+    """
+        Array representation of a Layer. Holds the membrane potential,
+        activation level and previous activation level of every node,
+        and the kernels of the links entering the layer.
+    """
+
+    def __init__(self, layer):
+        self.layer = layer
+        self.size = len(layer.nodes)
+
+        # Nodes without incomming arcs are never updated by Node.activate
+        self.updating = numpy.zeros(self.size, dtype=bool)
+        for link in layer.entering:
+            self.updating[link.post_index] = True
+        self.all_updating = bool(self.updating.all())
+
+        self.function = None
+        if self.updating.any():
+            self.function = Activation.kernel(layer.activation_function)
+
+        self.inputs = [] # (pre CompiledLayer, link) for inter layer links
+        self.intra = [] # links from the layer to itself
+
+        # Depends on levels from earlier recalls, see CompiledAnn.find_recurrent
+        self.recurrent = False
+
+        self.lower = [] # intra kernels reading the current level
+        self.upper = [] # intra kernels reading the previous level
+
+        self.reset_levels()
+
+    def reset_levels(self):
+        self.membrane_potential = numpy.zeros(self.size)
+        self.activation_level = numpy.zeros(self.size)
+        self.prev_activation_level = numpy.zeros(self.size)
+
+    def load_levels(self):
+        layer = self.layer
+        self.membrane_potential = layer.membrane_potentials.copy()
+        self.activation_level = layer.activation_levels.copy()
+        self.prev_activation_level = layer.prev_activation_levels.copy()
+
+    def store_levels(self):
+        layer = self.layer
+        layer.membrane_potentials[:] = self.membrane_potential
+        layer.activation_levels[:] = self.activation_level
+        layer.prev_activation_levels[:] = self.prev_activation_level
+
+    def split_intra(self):
+        """
+            Node.activate updates the nodes of a layer one at a time and
+            reads prev_activation_level for intra layer arcs. A node that
+            is already updated in this round has its old level stored as
+            the previous level, so arcs from updated nodes (j < i) use the
+            current level and all other arcs use the previous level.
+        """
+        self.lower, self.upper = [], []
+
+        for link in self.intra:
+            before = (link.pre_index < link.post_index) & self.updating[link.pre_index]
+
+            self.lower.append(link.make_kernel(numpy.flatnonzero(before)))
+            self.upper.append(link.make_kernel(numpy.flatnonzero(~before)))
+
+
+class CompiledAnn(object):
+    """
+        Vectorized forward engine for an Ann. Every link is turned into a
+        weighted sum kernel (see kernels.py), dense or sparse, and every
+        layer into activation vectors, so recall is a few matrix-vector
+        products. Gives the same results as walking the Node/Arc object
+        graph.
+    """
+
+    def __init__(self, ann, incremental=False):
+        ann.init_nodes()
+        self.ann = ann
+
+        # Incremental recall, see recall_incremental
+        self.incremental = incremental
+        self.valid = False # the levels are from a full recall with the current weights
+        self.active = None # active flags of the layers at the last recall
+        self.skipped = 0 # layers skipped by the last incremental recall
+
+        self.layers = {layer: CompiledLayer(layer) for layer in ann.layers}
+        self.execution_order = [self.layers[l] for l in ann.execution_order]
+
+        self.encoders = [self.layers[l] for l in ann.layers if l.type and l.type.lower() == "encoder"]
+        self.decoders = [self.layers[l] for l in ann.layers if l.type and l.type.lower() == "decoder"]
+
+        self.kernels = {}
+
+        for link in ann.links:
+            if link.pre_layer is link.post_layer:
+                self.layers[link.post_layer].intra.append(link)
+            else:
+                self.layers[link.post_layer].inputs.append((self.layers[link.pre_layer], link))
+
+        self.find_recurrent()
+        self.load_weights()
+        self.load_levels()
+
+    def find_recurrent(self):
+        """
+            A layer is recurrent when its new levels depend on more than
+            the levels its upstream layers got in this recall: it has
+            intra layer links, or input from a layer that is not updated
+            before it in the execution order.
+        """
+        position = dict((cl, i) for i, cl in enumerate(self.execution_order))
+
+        for cl in self.layers.values():
+            here = position.get(cl, len(position))
+            cl.recurrent = bool(cl.intra) or any(
+                pre not in self.encoders and position.get(pre, len(position)) >= here
+                    for pre, link in cl.inputs)
+
+    def load_weights(self):
+        """
+            Make the kernels again, after the arcs of the links changed.
+            When only the weights changed, build_weights is enough.
+        """
+        self.invalidate()
+
+        for link in self.ann.links:
+            self.kernels[link] = link.make_kernel()
+
+        for cl in self.layers.values():
+            cl.split_intra()
+
+    def build_weights(self):
+        """
+            Update the kernels after the arc weights changed, reusing
+            their matrices and arc orderings.
+        """
+        self.invalidate()
+
+        for kernel in self.kernels.values():
+            kernel.build()
+
+        for cl in self.layers.values():
+            for kernel in cl.lower + cl.upper:
+                kernel.build()
+
+    def load_levels(self):
+        """
+            Copy the activation levels of the nodes into the engine.
+        """
+        self.invalidate()
+
+        for cl in self.layers.values():
+            cl.load_levels()
+
+    def store_levels(self):
+        """
+            Copy the activation levels of the engine back to the nodes.
+        """
+        for cl in self.layers.values():
+            cl.store_levels()
+
+    def set_input(self, inputs):
+        inputs = numpy.asarray(inputs, dtype=float)
+        start = 0
+        for cl in self.encoders:
+            cl.prev_activation_level = cl.activation_level
+            cl.activation_level = inputs[..., start:start + cl.size].copy()
+            start += cl.size
+
+    def external_input(self, cl):
+        """
+            Summed weighted input to a layer from the other layers.
+        """
+        potential = numpy.zeros(cl.activation_level.shape)
+
+        for pre, link in cl.inputs:
+            if pre.layer.active:
+                potential += self.kernels[link].forward(pre.activation_level)
+
+        return potential
+
+    def activate(self, cl):
+        """
+            Update all nodes of a layer once, like Node.activate.
+        """
+        potential = self.external_input(cl)
+
+        for kernel in cl.lower:
+            potential += kernel.forward(cl.activation_level)
+        for kernel in cl.upper:
+            potential += kernel.forward(cl.prev_activation_level)
+
+        level = cl.function(potential)
+
+        if cl.all_updating:
+            cl.prev_activation_level = cl.activation_level
+            cl.activation_level = numpy.asarray(level, dtype=float)
+            cl.membrane_potential = potential
+        else:
+            upd = cl.updating
+            cl.prev_activation_level = numpy.where(upd, cl.activation_level, cl.prev_activation_level)
+            cl.activation_level = numpy.where(upd, level, cl.activation_level)
+            cl.membrane_potential = numpy.where(upd, potential, cl.membrane_potential)
+
+    def update(self, cl):
+        """
+            Same as Layer.update, timed when the Ann is profiled.
+        """
+        profiler = self.ann.profiler
+        if profiler is None:
+            return self.update_layer(cl)
+
+        start = profiler.clock()
+        self.update_layer(cl)
+        profiler.add_layer(cl.layer, profiler.clock() - start)
+
+    def update_layer(self, cl):
+        layer = cl.layer
+        if not layer.active:
+            layer.settling_rounds = 0
+            return
+
+        if not cl.updating.any():
+            # Nothing changes, but count the rounds Layer.update runs
+            if not layer.quiescent_mode or layer.max_settling < 1:
+                layer.settling_rounds = 1
+            else:
+                layer.settling_rounds = min(2, layer.max_settling)
+            return
+
+        if not layer.quiescent_mode or layer.max_settling < 1:
+            self.activate(cl)
+            layer.settling_rounds = 1
+            return
+
+        self.settle(cl)
+
+    def settle(self, cl):
+        """
+            Run a layer to quiescence, like Layer.update: update it until
+            no level changes by more than layer.settling_tolerance between
+            two rounds, or max_settling rounds have run. The rounds used
+            are stored in layer.settling_rounds.
+
+            The other layers do not change while the layer settles, so
+            their input is summed once, and every round only runs the
+            intra layer kernels. The rounds write into buffers made once,
+            and update the levels of the layer in place.
+        """
+        layer = cl.layer
+        tolerance = layer.settling_tolerance
+
+        external = self.external_input(cl)
+        potential = numpy.empty_like(external)
+        previous = numpy.empty_like(external)
+        scratch = numpy.empty_like(external)
+        mask = numpy.empty(external.shape, dtype=bool)
+
+        profiler = self.ann.profiler
+
+        rows = None
+        for i in range(layer.max_settling):
+            if profiler is not None:
+                start = profiler.clock()
+
+            numpy.copyto(potential, external)
+            for kernel in cl.lower:
+                potential += kernel.forward(cl.activation_level, scratch)
+            for kernel in cl.upper:
+                potential += kernel.forward(cl.prev_activation_level, scratch)
+
+            level = cl.function(potential)
+
+            numpy.copyto(previous, cl.activation_level)
+            if rows is None and cl.all_updating:
+                numpy.copyto(cl.prev_activation_level, previous)
+                numpy.copyto(cl.activation_level, level)
+                numpy.copyto(cl.membrane_potential, potential)
+            else:
+                updating = cl.updating
+                if rows is not None:
+                    updating = numpy.logical_and(updating, rows[:, numpy.newaxis], out=mask)
+
+                numpy.copyto(cl.prev_activation_level, previous, where=updating)
+                numpy.copyto(cl.activation_level, level, where=updating)
+                numpy.copyto(cl.membrane_potential, potential, where=updating)
+
+            if profiler is not None:
+                profiler.add_round(layer, i, profiler.clock() - start)
+
+            if i:
+                # Each sample of a batch stops settling on its own
+                difference = numpy.subtract(cl.activation_level, previous, out=scratch)
+                settled = (numpy.abs(difference, out=difference) <= tolerance).all(axis=-1)
+                if numpy.all(settled):
+                    break
+                rows = ~settled if settled.ndim else None
+
+        layer.settling_rounds = i + 1
+
+    def recall(self, inputs):
+        """
+            Sets input and update all layers.
+
+            Returns output node values.
+        """
+        if self.incremental:
+            return self.recall_incremental(inputs)
+
+        self.set_input(inputs)
+
+        for cl in self.execution_order:
+            self.update(cl)
+
+        return self.get_result()
+
+    def invalidate(self):
+        """
+            Make the next incremental recall a full one. Needed after
+            changing the levels of the engine from outside.
+        """
+        self.valid = False
+
+    def recall_incremental(self, inputs):
+        """
+            Recall that only updates the layers that can change: layers
+            with an input layer that changed in this recall, and
+            recurrent layers (see find_recurrent). The other layers keep
+            their levels, which are the same as an update would give,
+            so the results and levels are the same as a full recall.
+
+            Any change to the weights or levels through the engine, or
+            to which layers are active, makes the next recall full.
+        """
+        active = [cl.layer.active for cl in self.execution_order]
+        full = not self.valid or active != self.active
+        self.active = active
+
+        before = [cl.activation_level for cl in self.encoders]
+        self.set_input(inputs)
+
+        changed = set(cl for cl, level in zip(self.encoders, before)
+                        if full or not numpy.array_equal(level, cl.activation_level))
+
+        self.skipped = 0
+        for cl in self.execution_order:
+            if full or cl.recurrent or any(pre in changed for pre, link in cl.inputs):
+                # A copy, settle changes the levels in place
+                level = cl.activation_level.copy()
+                self.update(cl)
+
+                if full or not numpy.array_equal(level, cl.activation_level):
+                    changed.add(cl)
+
+            else:
+                # An update would give the same levels, and move them
+                # to the previous levels of the updating nodes
+                if cl.updating.any():
+                    cl.prev_activation_level = numpy.where(cl.updating, cl.activation_level, cl.prev_activation_level)
+                    self.skipped += 1
+
+        self.valid = True
+        return self.get_result()
+
+    def recall_batch(self, inputs):
+        """
+            Recall an (N x inputs) array in one pass and return an
+            (N x outputs) array. Every row starts from the current
+            levels of the network, as if recall was called on it
+            alone, and the levels are left untouched afterwards.
+        """
+        inputs = numpy.atleast_2d(numpy.asarray(inputs, dtype=float))
+        levels = self.run_batch(inputs)
+
+        if not self.decoders:
+            return numpy.zeros((inputs.shape[0], 0))
+        return numpy.concatenate([levels[cl.layer] for cl in self.decoders], axis=-1)
+
+    def run_batch(self, inputs):
+        """
+            Runs a batch like recall_batch, and returns the (N x nodes)
+            activation levels of every layer keyed by layer.
+        """
+        inputs = numpy.atleast_2d(numpy.asarray(inputs, dtype=float))
+        n = inputs.shape[0]
+
+        saved = [(cl, cl.membrane_potential, cl.activation_level, cl.prev_activation_level)
+                    for cl in self.layers.values()]
+        try:
+            for cl in self.layers.values():
+                cl.membrane_potential = numpy.tile(cl.membrane_potential, (n, 1))
+                cl.activation_level = numpy.tile(cl.activation_level, (n, 1))
+                cl.prev_activation_level = numpy.tile(cl.prev_activation_level, (n, 1))
+
+            self.set_input(inputs)
+
+            for cl in self.execution_order:
+                self.update(cl)
+
+            return {cl.layer: cl.activation_level for cl in self.layers.values()}
+        finally:
+            for cl, membrane, level, prev in saved:
+                cl.membrane_potential = membrane
+                cl.activation_level = level
+                cl.prev_activation_level = prev
+
+    def get_levels(self):
+        """
+            Activation levels of the output nodes as an array.
+        """
+        if not self.decoders:
+            return numpy.zeros(0)
+        return numpy.concatenate([cl.activation_level for cl in self.decoders], axis=-1)
+
+    def get_result(self):
+        return self.get_levels().tolist()
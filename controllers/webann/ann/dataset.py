@@ -0,0 +1,165 @@
+import os
+import re
+import numpy
+from array import array
+from numpy.lib import format as npy
+from snapshot import write_atomic
+
+# A bracketed list of numbers, without nested brackets
+_group = re.compile(r"\[([^\[\]]*)\]")
+
+
+def parse_numbers(text):
+    """
+        Parses a comma separated list of numbers.
+    """
+    text = text.strip()
+    if not text:
+        return []
+    return [float(n) for n in text.split(",")]
+
+
+def parse_sample(line):
+    """
+        Parses one line on the form [[inputs], [targets]], as written
+        by fill_learning_data. Returns (inputs, targets) as lists of
+        floats, raises ValueError for anything else.
+    """
+    text = line.strip()
+    if not (text.startswith("[") and text.endswith("]")):
+        raise ValueError("Not a sample: %r" % line)
+
+    inner = text[1:-1]
+    groups = _group.findall(inner)
+
+    # Only the two lists and a separating comma are allowed
+    if len(groups) != 2 or _group.sub("", inner).strip() != ",":
+        raise ValueError("Not a sample: %r" % line)
+
+    return parse_numbers(groups[0]), parse_numbers(groups[1])
+
+
+def iter_samples(filename):
+    """
+        Streams (inputs, targets) from a data file, one line at a time.
+    """
+    with open(filename, "r") as f:
+        for line in f:
+            if line.strip():
+                yield parse_sample(line)
+
+
+# A cache file is a header line with the size and modification time of
+# the data file it was parsed from, padded to CACHE_HEADER bytes, followed
+# by the parsed record array in the .npy format
+CACHE_MAGIC = b"ANNDATA "
+CACHE_HEADER = 64
+
+
+def cache_name(filename):
+    return filename + ".cache"
+
+
+def source_key(filename):
+    stat = os.stat(filename)
+    return "%i %r" % (stat.st_size, stat.st_mtime)
+
+
+def write_cache(cached, data, key):
+    def write(f):
+        f.write((CACHE_MAGIC + key + "\n").ljust(CACHE_HEADER))
+        npy.write_array(f, data)
+
+    write_atomic(cached, write)
+
+
+def read_cache(cached, key, mmap_mode="r"):
+    """
+        The record array of a cache file, memory mapped unless mmap_mode
+        is None, or None if the cache is for another key or is broken.
+    """
+    try:
+        with open(cached, "rb") as f:
+            if f.read(CACHE_HEADER).rstrip() != CACHE_MAGIC + key:
+                return None
+
+            version = npy.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = npy.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = npy.read_array_header_2_0(f)
+            offset = f.tell()
+
+            count = int(numpy.prod(shape))
+            if fortran or os.fstat(f.fileno()).st_size < offset + count * dtype.itemsize:
+                return None
+
+            if mmap_mode is None:
+                return numpy.fromfile(f, dtype=dtype, count=count).reshape(shape)
+
+        if not count:
+            return numpy.zeros(shape, dtype=dtype)
+        return numpy.memmap(cached, dtype=dtype, mode=mmap_mode, offset=offset, shape=shape)
+
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def sample_dtype(n_inputs, n_targets):
+    return numpy.dtype([("inputs", "f8", (n_inputs,)), ("targets", "f8", (n_targets,))])
+
+
+def parse_dataset(filename):
+    """
+        Parses a data file into a record array with the fields
+        'inputs' and 'targets'.
+    """
+    values = array("d")
+    widths = None
+
+    for inputs, targets in iter_samples(filename):
+        if widths is None:
+            widths = (len(inputs), len(targets))
+        elif widths != (len(inputs), len(targets)):
+            raise ValueError("Sample sizes differ in %s" % filename)
+
+        values.extend(inputs)
+        values.extend(targets)
+
+    if widths is None:
+        return numpy.zeros(0, dtype=sample_dtype(0, 0))
+
+    flat = numpy.frombuffer(values, dtype=float).reshape(-1, sum(widths))
+    data = numpy.empty(len(flat), dtype=sample_dtype(*widths))
+    data["inputs"] = flat[:, :widths[0]]
+    data["targets"] = flat[:, widths[0]:]
+    return data
+
+
+def load_dataset(filename, cache=True, mmap_mode="r"):
+    """
+        Load a data file as (inputs, targets) arrays.
+
+        With cache set, the parsed data is saved next to the file (see
+        cache_name), and later loads memory map it instead of parsing the
+        text again, as long as the text file has the same size and
+        modification time. The cache is written to a temporary file and
+        renamed, so an interrupted run never leaves half of one.
+    """
+    cached = cache_name(filename)
+
+    if cache:
+        key = source_key(filename)
+        data = read_cache(cached, key, mmap_mode)
+        if data is not None:
+            return data["inputs"], data["targets"]
+
+    data = parse_dataset(filename)
+
+    if cache:
+        try:
+            write_cache(cached, data, key)
+        except (IOError, OSError):
+            pass # Read only location, use the parsed data
+
+    return data["inputs"], data["targets"]
@@ -0,0 +1,150 @@
+"""
+    Weighted sum kernels for the links of the compiled engine.
+
+    DenseKernel keeps a (post x pre) weight matrix, and is the fastest for
+    links where most pairs of nodes have an arc. SparseKernel works on the
+    arcs only, grouped by post node (CSR) for the forward sums and by pre
+    node (CSC) for the backward sums, so stochastic links and links with
+    explicit arc lists cost memory and time by number of arcs.
+
+    Both take levels shaped (..., pre nodes) or deltas shaped (..., post
+    nodes), so single samples and (N x nodes) batches work the same way.
+    Link.make_kernel picks one of them for a link.
+"""
+
+import numpy
+
+
+class Kernel(object):
+    """
+        The arcs of a link, or of the subset of its arcs given by the
+        index array 'arcs'. Weights are read from the link by build(),
+        which has to be called again when they change.
+    """
+
+    sparse = False
+
+    def __init__(self, link, arcs=None):
+        self.link = link
+        self.shape = (len(link.post_layer.nodes), len(link.pre_layer.nodes))
+        self.arcs = arcs
+
+        if arcs is None:
+            self.post_index, self.pre_index = link.post_index, link.pre_index
+        else:
+            self.post_index, self.pre_index = link.post_index[arcs], link.pre_index[arcs]
+
+        self.build()
+
+    def arc_weights(self):
+        if self.arcs is None:
+            return self.link.current_weights
+        return self.link.current_weights[self.arcs]
+
+    def build(self):
+        raise NotImplementedError
+
+    def forward(self, levels, out=None):
+        """
+            Weighted sums into the post nodes, written into 'out' when
+            it is given, to reuse a buffer.
+        """
+        raise NotImplementedError
+
+    def backward(self, deltas):
+        """
+            Weighted sums of post node deltas into the pre nodes.
+        """
+        raise NotImplementedError
+
+    def gradient(self, deltas, levels):
+        """
+            Post delta times pre level for every arc, summed over a batch.
+        """
+        raise NotImplementedError
+
+
+class DenseKernel(Kernel):
+
+    def build(self):
+        if not hasattr(self, 'matrix'):
+            self.matrix = numpy.zeros(self.shape)
+            cells = self.post_index.astype(numpy.int64) * self.shape[1] + self.pre_index
+            self.unique = len(numpy.unique(cells)) == len(cells)
+
+        # Without repeated arcs the weights are written over the old
+        # ones, otherwise arcs between the same nodes are summed
+        if self.unique:
+            self.matrix[self.post_index, self.pre_index] = self.arc_weights()
+        else:
+            self.matrix.fill(0.0)
+            numpy.add.at(self.matrix, (self.post_index, self.pre_index), self.arc_weights())
+
+    def forward(self, levels, out=None):
+        return numpy.dot(levels, self.matrix.T, out=out)
+
+    def backward(self, deltas):
+        return deltas.dot(self.matrix)
+
+    def gradient(self, deltas, levels):
+        products = numpy.atleast_2d(deltas).T.dot(numpy.atleast_2d(levels))
+        return products[self.post_index, self.pre_index]
+
+
+class Segments(object):
+    """
+        Arcs sorted and grouped by the node at one end, with the node
+        at the other end and the weight of every arc. Grouped by post
+        node this is the CSR form of the weight matrix.
+    """
+
+    def __init__(self, index, other, size):
+        self.order = numpy.argsort(index, kind='mergesort')
+        self.other = other[self.order]
+        self.size = size
+
+        # Only groups with arcs, reduceat can not sum empty ones
+        bounds = numpy.searchsorted(index[self.order], numpy.arange(size + 1))
+        self.nodes = numpy.flatnonzero(bounds[1:] > bounds[:-1])
+        self.starts = bounds[self.nodes]
+
+    def set_weights(self, weights):
+        if not hasattr(self, 'weights'):
+            self.weights = numpy.empty(len(self.order))
+        numpy.take(weights, self.order, out=self.weights)
+
+    def sum(self, values, out=None):
+        if out is None:
+            result = numpy.zeros(values.shape[:-1] + (self.size,))
+        else:
+            result = out
+            result.fill(0.0)
+
+        if len(self.starts):
+            products = values[..., self.other] * self.weights
+            result[..., self.nodes] = numpy.add.reduceat(products, self.starts, axis=-1)
+        return result
+
+
+class SparseKernel(Kernel):
+
+    sparse = True
+
+    def build(self):
+        if not hasattr(self, 'rows'):
+            self.rows = Segments(self.post_index, self.pre_index, self.shape[0])
+            self.columns = Segments(self.pre_index, self.post_index, self.shape[1])
+
+        weights = self.arc_weights()
+        self.rows.set_weights(weights)
+        self.columns.set_weights(weights)
+
+    def forward(self, levels, out=None):
+        return self.rows.sum(levels, out)
+
+    def backward(self, deltas):
+        return self.columns.sum(deltas)
+
+    def gradient(self, deltas, levels):
+        deltas, levels = numpy.atleast_2d(deltas), numpy.atleast_2d(levels)
+        return numpy.einsum('ij,ij->j', deltas[:, self.post_index], levels[:, self.pre_index])
@@ -1,14 +1,23 @@
-from math import exp
+import numpy
+from math import exp, tanh
+from functools import partial
 from node import Node
 
 
 class Activation(object):
 
+    # Array versions of the functions and their derivatives, by function. See register
+    kernels = {}
+
     @staticmethod
     def sigmoid_log(inpt):
         """
             A sigmoid logistic function, which outputs values in the range [0,1].
         """
+        # exp of a large positive number overflows, so only take it of negative ones
+        if inpt < 0:
+            e = exp(inpt)
+            return e/(1.0 + e)
         return 1.0/(1.0 + exp(-inpt))
 
     @staticmethod
@@ -16,15 +25,14 @@ class Activation(object):
         """
             A sigmoid tanh function, which outputs values in the range [-1, 1].
         """
-        e = exp(2*inpt)
-        return (e-1)/(e+1)
+        return tanh(inpt)
 
     @staticmethod
     def step(inpt, T = 0.5):
         """
             A step function with a threshold, T, that outputs values in the range [0,1]
         """
-        return int(not inpt < T)
+        return 0.0 if inpt < T else 1.0
 
     @staticmethod
     def linear(inpt):
@@ -42,6 +50,102 @@ class Activation(object):
             return 0.0
         return inpt
 
+    @staticmethod
+    def sigmoid_log_array(x):
+        # Same split as sigmoid_log, exp(-|x|) never overflows
+        e = numpy.exp(-numpy.abs(x))
+        return numpy.where(x < 0, e, 1.0) / (1.0 + e)
+
+    @staticmethod
+    def step_array(x, T = 0.5):
+        return numpy.where(x < T, 0.0, 1.0)
+
+    @staticmethod
+    def linear_array(x):
+        return numpy.array(x, dtype=float)
+
+    @staticmethod
+    def pos_linear_array(x):
+        return numpy.where(x < 0, 0.0, x)
+
+    @staticmethod
+    def sigmoid_log_derivative(a):
+        # P(t) * (1 - P(t)) where P(t) is the logistic function
+        return a * (1 - a)
+
+    @staticmethod
+    def sigmoid_tanh_derivative(a):
+        # 1 - tanh^2 (x), and a is tanh(x) already
+        return 1 - a * a
+
+    @staticmethod
+    def step_derivative(a, T = 0.5):
+        # Can't derivate descrete functions
+        return numpy.zeros_like(a, dtype=float)
+
+    @staticmethod
+    def linear_derivative(a):
+        return numpy.ones_like(a, dtype=float)
+
+    @staticmethod
+    def register(fn, kernel, derivative):
+        """
+            Register the array versions of an activation function, used
+            on all nodes of a layer at once. 'kernel' takes an array of
+            membrane potentials and returns the activation levels, and
+            'derivative' takes the activation levels and returns the
+            derivative at each of them, written in terms of the level
+            (the output) so no activation has to be computed again.
+        """
+        Activation.kernels[fn] = (kernel, derivative)
+
+    @staticmethod
+    def lookup(fn):
+        if fn in Activation.kernels:
+            return Activation.kernels[fn]
+
+        if isinstance(fn, partial) and fn.func in Activation.kernels:
+            kernel, derivative = Activation.kernels[fn.func]
+            args, keywords = fn.args, fn.keywords or {}
+            return partial(kernel, *args, **keywords), partial(derivative, *args, **keywords)
+
+        return None
+
+    @staticmethod
+    def kernel(fn):
+        """
+            The array version of an activation function. Works for
+            partials of registered functions, like the step functions
+            of the parser. Other functions are wrapped with
+            numpy.vectorize.
+        """
+        kernels = Activation.lookup(fn)
+        if kernels is None:
+            return numpy.vectorize(fn, otypes=[float])
+        return kernels[0]
+
+    @staticmethod
+    def derivative(fn):
+        """
+            The array derivative of an activation function, taking
+            activation levels. Unknown partials are taken as step
+            functions, with no derivative, and other unknown functions
+            as linear.
+        """
+        kernels = Activation.lookup(fn)
+        if kernels is None:
+            if isinstance(fn, partial):
+                return lambda a: numpy.zeros_like(a, dtype=float)
+            return lambda a: numpy.ones_like(a, dtype=float)
+        return kernels[1]
+
+Activation.register(Activation.sigmoid_log, Activation.sigmoid_log_array, Activation.sigmoid_log_derivative)
+Activation.register(Activation.sigmoid_tanh, numpy.tanh, Activation.sigmoid_tanh_derivative)
+Activation.register(Activation.step, Activation.step_array, Activation.step_derivative)
+Activation.register(Activation.linear, Activation.linear_array, Activation.linear_derivative)
+Activation.register(Activation.pos_linear, Activation.pos_linear_array, Activation.linear_derivative)
+
+
 class Layer(object):
     """
         The general layer class houses a collection of nodes along 
@@ -74,13 +178,22 @@ class Layer(object):
         self.name = name
         self.type = io_type
 
+        # Levels of all nodes, stored together. Node i reads position i.
+        size = nodes if isinstance(nodes, int) else len(nodes)
+        self.membrane_potentials = numpy.zeros(size)
+        self.activation_levels = numpy.zeros(size)
+        self.prev_activation_levels = numpy.zeros(size)
+        self.deltas = numpy.zeros(size) # used by back propagation
+
         # 1. If the number of nodes wished is passed as argument, create nodes
         if isinstance(nodes, int):
-            self.nodes = [Node(self) for n in range(nodes)]
+            self.nodes = [Node(self, n) for n in range(nodes)]
         else:
             # List of nodes given. Set all to have current layer
-            for node in nodes:
+            self.nodes = nodes
+            for i, node in enumerate(nodes):
                 node.layer = self
+                node.index = i
 
         # 2. Referance of one of sigmoid (log/tanh), step and (pos_)linear
         self.activation_function = activation_function
@@ -97,15 +210,29 @@ class Layer(object):
         self.quiescent_mode = False
         self.max_settling = 0
 
+        # Quiescent layers stop settling when no level changes by more
+        # than this between two rounds
+        self.settling_tolerance = 0.0
+        self.settling_rounds = 0 # rounds used by the last update
+
     def __str__(self):
         return str(self.name)
 
-    def update(self, quiescent_mode=None):
+    def reset_levels(self):
+        """
+            Reset the levels of all nodes.
+        """
+        self.membrane_potentials.fill(0)
+        self.activation_levels.fill(0)
+        self.prev_activation_levels.fill(0)
+
+    def update(self, quiescent_mode=None, profiler=None):
 
         if quiescent_mode == None:
             quiescent_mode = self.quiescent_mode
 
         if not(self.active):
+            self.settling_rounds = 0
             return
 
         if not quiescent_mode or self.max_settling < 1:
@@ -113,44 +240,47 @@ class Layer(object):
             for node in self.nodes:
                 node.activate()
 
+            self.settling_rounds = 1
             return
 
         # Is quiescent mode
-        prev = []
+        prev = None
         # Avoid infinite loop.
         for i in range(self.max_settling):            
-            self.update(False) # Update
+            if profiler is not None:
+                start = profiler.clock()
+
+            for node in self.nodes:
+                node.activate()
 
             # Get current activation levels..
-            current = [node.activation_level for node in self.nodes]
+            current = self.activation_levels.copy()
+
+            if profiler is not None:
+                profiler.add_round(self, i, profiler.clock() - start)
 
             # Check for changes
-            if current == prev:
+            if prev is not None and numpy.all(numpy.abs(current - prev) <= self.settling_tolerance):
                 break
             
             # Has changed. Run more
             prev = current
 
+        self.settling_rounds = i + 1
+
     def derivate(self, node):
         """
             Derivative of the activation function for back-propagation.
         """
-        a = node.activation_level
-
-        if self.activation_function == Activation.sigmoid_log:
-            # P(t) * (1 - P(t)) where P(t) is the logistic function
-            return a * (1 - a)
-
-        elif self.activation_function == Activation.sigmoid_tanh:
-            # 1 - tanh^2 (x)
-            return 1 - (Activation.sigmoid_tanh(a) ** 2)
+        derivative = Activation.derivative(self.activation_function)
+        return float(derivative(numpy.float64(node.activation_level)))
 
-        elif self.activation_function == Activation.step or hasattr(self.activation_function, 'func'):
-            # Can't derivate descrete functions
-            return 0.0        
-
-        # Linear 
-        return 1.0
+    def derivatives(self):
+        """
+            Derivative of the activation function for all nodes at once,
+            from their activation levels.
+        """
+        return Activation.derivative(self.activation_function)(self.activation_levels)
 
     def activation_function (self, inpt):
 
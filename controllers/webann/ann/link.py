@@ -1,10 +1,16 @@
 import random
+import numpy
+from functools import partial
 from arc import *
 from node import *
 from layer import *
+from kernels import DenseKernel, SparseKernel
 
 class LearningRule(object):
 
+    # Array versions of the rules, by rule. See register
+    kernels = {}
+
     @staticmethod
     def hebbian(arc, rate, pre, post):
         return rate * pre * post
@@ -17,12 +23,53 @@ class LearningRule(object):
     def oja(arc, rate, pre, post):
         return rate * pre * (post - (pre * arc.current_weight))
 
+    @staticmethod
+    def hebbian_array(weights, rate, pre, post):
+        return rate * pre * post
+
+    @staticmethod
+    def general_hebb_array(weights, rate, pre, post, threshold=0.5):
+        return rate * (pre - threshold) * (post - threshold)
+
+    @staticmethod
+    def oja_array(weights, rate, pre, post):
+        return rate * pre * (post - (pre * weights))
+
+    @staticmethod
+    def register(rule, kernel):
+        """
+            Register an array version of a learning rule, used by
+            Link.learn to update all arcs of a link at once. It is called
+            as kernel(weights, rate, pre, post), with the weights of all
+            arcs and the pre and post activation level of every arc, and
+            returns the weight changes.
+        """
+        LearningRule.kernels[rule] = kernel
+
+    @staticmethod
+    def kernel(rule):
+        """
+            The array version of a rule, or None if it has none.
+            Works for partials of registered rules too.
+        """
+        if rule in LearningRule.kernels:
+            return LearningRule.kernels[rule]
+
+        if isinstance(rule, partial) and rule.func in LearningRule.kernels:
+            return partial(LearningRule.kernels[rule.func], *rule.args, **(rule.keywords or {}))
+
+        return None
+
+LearningRule.register(LearningRule.hebbian, LearningRule.hebbian_array)
+LearningRule.register(LearningRule.general_hebb, LearningRule.general_hebb_array)
+LearningRule.register(LearningRule.oja, LearningRule.oja_array)
+
 class Link(object):
 
     def __init__(self, pre_layer = None, post_layer = None, topology=None, 
                 arc_range=[-0.1, 0.1], learning_rate=0.2, 
                 weights=None, arcs=None,
-                learning_rule = None):
+                learning_rule = None, sparse = None):
 
         self.pre_layer = pre_layer
         self.post_layer = post_layer
@@ -30,89 +77,210 @@ class Link(object):
         self.arc_range = arc_range
         self.learning_rate = learning_rate
         self.learning_rule = learning_rule
+        self.sparse = sparse # None to choose by density
 
-        self.arcs = arcs
+        self.arcs = ArcList(self)
         self.init_arcs = arcs # For using in export
 
         self.weights = weights
         self.init_weights = weights # for using in export
 
-    def get_random_weight(self):
-        return random.uniform(*self.arc_range)
+        # (Snapshot, link number, weights kind) to map the arcs from
+        # instead, see Snapshot.load_link
+        self.snapshot = None
 
-    def export_arcs(self):
-        arcs = []
+        # Arc storage, filled by generate_arcs. Arc i goes from
+        # pre node pre_index[i] to post node post_index[i].
+        self.pre_index = numpy.zeros(0, dtype=numpy.int32)
+        self.post_index = numpy.zeros(0, dtype=numpy.int32)
+        self.current_weights = numpy.zeros(0)
+        self.initial_weights = numpy.zeros(0)
 
-        pre_nodes = self.pre_layer.nodes
-        post_nodes = self.post_layer.nodes
+        self._incoming = None # arcs grouped by post node
+        self._outgoing = None # arcs grouped by pre node
 
-        for i, arc in enumerate(self.arcs):
-            arcs.append( (pre_nodes.index(arc.pre_node), post_nodes.index(arc.post_node)) )
+    # Links with a smaller share of all possible arcs use the sparse kernel
+    sparse_density = 0.02
 
-        return arcs
+    def density(self):
+        possible = len(self.pre_layer.nodes) * len(self.post_layer.nodes)
+        return len(self.pre_index) / float(possible) if possible else 0.0
 
-    def export_weights(self):
-        weights = []
+    def is_sparse(self):
+        if self.sparse is not None:
+            return self.sparse
+        return self.density() < Link.sparse_density
+
+    def make_kernel(self, arcs=None):
+        """
+            Weighted sum kernel (see kernels.py) for the arcs of the link,
+            or for the arcs given by the index array 'arcs'.
+        """
+        if self.is_sparse():
+            return SparseKernel(self, arcs)
+        return DenseKernel(self, arcs)
+
+    def get_random_weight(self):
+        return random.uniform(*self.arc_range)
+
+    def export_arcs(self):
+        return zip(self.pre_index.tolist(), self.post_index.tolist())
 
-        for i, arc in enumerate(self.arcs):
-            weights.append(arc.current_weight)
+    def export_weights(self):
+        return self.current_weights.tolist()
 
-        return weights
+    def reset(self):
+        """
+            Return all weights to the initial weights.
+        """
+        self.current_weights[:] = self.initial_weights
 
     def generate_arcs(self, connection_prob=0.4):
         """
-        Generates the arcs based on the connection topology type
-        Node(pre_node,post_node,current_weight,init_weight,link)
-         self.arcs = [Arc(Node(),Node(),self.get_random_weight(),self.get_random_weight(),self) for i in range(n_arcs)]
+        Generates the arcs based on the connection topology type, as
+        index arrays of pre and post nodes with a weight array. The
+        index arrays are built directly with numpy, random topologies
+        and weights are drawn from numpy.random.
         """
 
-        pre_nodes = self.pre_layer.nodes
-        post_nodes = self.post_layer.nodes
-            
-        connect = lambda pre_node, post_node: Arc(pre_node, post_node, link=self)
+        if self.snapshot is not None:
+            snapshot, index, kind = self.snapshot
+            snapshot.load_link(self, index, kind, kind)
+            return self.arcs
 
-        if self.arcs:
-            self.arcs = [connect(pre_nodes[i], post_nodes[j]) for i, j in self.arcs]
+        lena, lenb = len(self.pre_layer.nodes), len(self.post_layer.nodes)
+
+        if self.init_arcs is not None and len(self.init_arcs):
+            pairs = numpy.asarray(self.init_arcs, dtype=numpy.int32).reshape(-1, 2)
+            pre, post = pairs[:, 0], pairs[:, 1]
 
         elif self.topology == '1-1' or not(self.topology):
-            self.arcs = [connect(pre_node, post_node) for j, pre_node in enumerate(pre_nodes) for i, post_node in enumerate(post_nodes) if i == j]
+            pre = post = numpy.arange(min(lena, lenb), dtype=numpy.int32)
 
         elif self.topology == 'full':
-            self.arcs = [connect(pre_node, post_node) for pre_node in (pre_nodes) for post_node in (post_nodes)]
+            pre = numpy.repeat(numpy.arange(lena, dtype=numpy.int32), lenb)
+            post = numpy.tile(numpy.arange(lenb, dtype=numpy.int32), lena)
 
         elif self.topology == 'stochastic':
-            self.arcs = [connect(pre_node, post_node) for pre_node in (pre_nodes) for post_node in (post_nodes) if random.random() < connection_prob]
+            pre, post = self._sample_arcs(lena, lenb, connection_prob)
 
         elif self.topology == 'triangulate':
-            self.arcs = [connect(pre_node, post_node) for j, pre_node in enumerate(pre_nodes) for i, post_node in enumerate(post_nodes) if i != j]
+            pre = numpy.repeat(numpy.arange(lena, dtype=numpy.int32), lenb)
+            post = numpy.tile(numpy.arange(lenb, dtype=numpy.int32), lena)
+            keep = pre != post
+            pre, post = pre[keep], post[keep]
 
         elif self.topology == '2-1':
-            lena, lenb = len(pre_nodes), len(post_nodes)
-            self.arcs = [connect(pre_nodes[i % lena], post_nodes[(i+j) % lenb] ) for j in range(2) for i in range(max(lena, lenb))]
+            size = max(lena, lenb)
+            i = numpy.tile(numpy.arange(size, dtype=numpy.int32), 2)
+            j = numpy.repeat(numpy.arange(2, dtype=numpy.int32), size)
+            pre, post = i % lena, (i + j) % lenb
 
+        else:
+            pre = post = numpy.zeros(0, dtype=numpy.int32)
 
-        self.pre_layer.exiting.append(self)
-        self.post_layer.entering.append(self)
+        self.connect()
 
         # Add weights to the arcs
-        for i, arc in enumerate(self.arcs):
-            if self.weights is not None and len(self.weights) > i:
-                weight = self.weights[i]
-            else:
-                weight = random.uniform(*self.arc_range)
+        n = len(pre)
+        given = 0 if self.weights is None else min(len(self.weights), n)
+
+        weights = numpy.empty(n)
+        if given:
+            weights[:given] = self.weights[:given]
+        weights[given:] = numpy.random.uniform(self.arc_range[0], self.arc_range[1], n - given)
+
+        return self.set_arcs(pre, post, weights)
+
+    def connect(self):
+        """
+            Register the link with the layers it connects.
+        """
+        if self not in self.pre_layer.exiting:
+            self.pre_layer.exiting.append(self)
+        if self not in self.post_layer.entering:
+            self.post_layer.entering.append(self)
+
+    def set_arcs(self, pre_index, post_index, weights, init_weights=None, copy=True):
+        """
+            Replace the arcs of the link with arrays of pre and post
+            node indices and weights. The arrays are copied, unless copy
+            is False and they already have the right types, like the
+            memory mapped arrays of a Snapshot.
+        """
+        array = numpy.array if copy else numpy.asarray
 
-            arc.current_weight = weight
-            arc.init_weight = weight
+        self.pre_index = array(pre_index, dtype=numpy.int32)
+        self.post_index = array(post_index, dtype=numpy.int32)
+        self._incoming = self._outgoing = None
 
+        self.current_weights = array(weights, dtype=float)
+        if init_weights is None:
+            self.initial_weights = self.current_weights.copy()
+        else:
+            self.initial_weights = array(init_weights, dtype=float)
+
+        self.arcs = ArcList(self)
         return self.arcs
 
+    @staticmethod
+    def _sample_arcs(lena, lenb, connection_prob, block=1 << 20):
+        # Sample the connection matrix a block of rows at a time
+        rows = max(1, block // max(lenb, 1))
+        pre, post = [], []
+        for start in range(0, lena, rows):
+            i, j = numpy.nonzero(numpy.random.random((min(rows, lena - start), lenb)) < connection_prob)
+            pre.append(i + start)
+            post.append(j)
+
+        if not pre:
+            return numpy.zeros(0, dtype=numpy.int32), numpy.zeros(0, dtype=numpy.int32)
+        return numpy.concatenate(pre), numpy.concatenate(post)
+
+    def _group(self, index, size):
+        # Arc indices sorted by node, and where each node starts
+        order = numpy.argsort(index, kind='mergesort')
+        starts = numpy.searchsorted(index[order], numpy.arange(size + 1))
+        return order, starts
+
+    def incoming(self, post):
+        """
+            Indices of the arcs entering post node number 'post'.
+        """
+        if self._incoming is None:
+            self._incoming = self._group(self.post_index, len(self.post_layer.nodes))
+
+        order, starts = self._incoming
+        return order[starts[post]:starts[post + 1]]
+
+    def outgoing(self, pre):
+        """
+            Indices of the arcs leaving pre node number 'pre'.
+        """
+        if self._outgoing is None:
+            self._outgoing = self._group(self.pre_index, len(self.pre_layer.nodes))
+
+        order, starts = self._outgoing
+        return order[starts[pre]:starts[pre + 1]]
+
     def learn(self):
         """
             Use the learning rule to alter weights
-            of arcs. 
+            of arcs. Rules with an array version (see
+            LearningRule.register) update all arcs at once.
         """        
         
-        if self.learning_rate and self.post_layer.learning_mode:
+        if not (self.learning_rate and self.post_layer.learning_mode):
+            return
+
+        kernel = LearningRule.kernel(self.learning_rule)
+
+        if kernel is not None:
+            pre = self.pre_layer.activation_levels[self.pre_index]
+            post = self.post_layer.activation_levels[self.post_index]
+            self.current_weights += kernel(self.current_weights, self.learning_rate, pre, post)
+
+        else:
             for arc in self.arcs:
                 arc.current_weight += self.learning_rule(arc, self.learning_rate,
                         arc.pre_node.activation_level,
@@ -133,24 +301,30 @@ class Link(object):
         """
 
         # 1.
-        for node in self.post_layer.nodes:
+        post_layer = self.post_layer
 
-            if node.layer.type and node.layer.type.lower() == "decoder":
-                delta = targets[outputs.index(node)] - node.activation_level  
+        if post_layer.nodes and post_layer.type and post_layer.type.lower() == "decoder":
+            # The nodes of an output layer are next to each other in outputs
+            start = outputs.index(post_layer.nodes[0])
+            stop = start + len(post_layer.nodes)
+            delta = numpy.asarray(targets[start:stop], dtype=float) - post_layer.activation_levels
 
-            else: 
-                delta = node._delta
+        else: 
+            delta = post_layer.deltas
 
-            node._delta = node.layer.derivate(node) * delta
+        post_layer.deltas[:] = post_layer.derivatives() * delta
 
         # 2.
-        for node in self.pre_layer.nodes:
-            delta = sum([arc.current_weight * arc.post_node._delta for arc in node.outgoing ])
+        pre_size = len(self.pre_layer.nodes)
+        deltas = numpy.zeros(pre_size)
+        for link in self.pre_layer.exiting:
+            post_deltas = link.post_layer.deltas
+            deltas += numpy.bincount(link.pre_index,
+                weights=link.current_weights * post_deltas[link.post_index], minlength=pre_size)
 
-            node._delta = delta
+        self.pre_layer.deltas[:] = deltas
 
         # 3.
-        diff_val = lambda a: (self.learning_rate * a.pre_node.activation_level * a.post_node._delta)
-        for arc in self.arcs:
-            arc.current_weight += diff_val(arc)
-
+        pre_levels = self.pre_layer.activation_levels
+        post_deltas = self.post_layer.deltas
+        self.current_weights += self.learning_rate * pre_levels[self.pre_index] * post_deltas[self.post_index]
@@ -0,0 +1,115 @@
+"""
+    Parsing of the list values in ANN scripts, without eval.
+
+    Numeric lists, like weights = [0.1, -0.2, ...], and lists of number
+    pairs, like arcs = [(0, 1), (0, 2), ...], are read by numpy straight
+    into an array, so no Python list of floats or tuples is built on the
+    way. Anything else (lists of layer names, nested lists), and any list
+    numpy can not read exactly as Python would, goes through
+    ast.literal_eval, which only accepts literals.
+"""
+
+import ast
+import string
+import numpy
+
+_whitespace = " \t\r\n"
+_number_chars = string.digits + ".eE+-," + _whitespace
+_all_chars = "".join(chr(i) for i in range(256))
+
+
+def _delete_all_but(chars):
+    return "".join(c for c in _all_chars if c not in chars)
+
+# For str.translate, to keep only the list structure
+_not_structure = _delete_all_but("(),")
+_not_float = _delete_all_but(".eE")
+
+_int64 = numpy.iinfo(numpy.int64)
+
+
+def _only(text, chars):
+    return not text.translate(None, chars)
+
+
+def _all_have_digits(text):
+    """
+        True if every comma separated value in text has a digit. numpy
+        reads empty values and lone signs as 0.
+    """
+    if not text.rstrip(_whitespace) or text.rstrip(_whitespace).endswith(","):
+        return False
+
+    codes = numpy.frombuffer(text, dtype=numpy.uint8)
+    digits = (codes - ord("0")) < 10
+    starts = numpy.concatenate(([0], numpy.flatnonzero(codes == ord(",")) + 1))
+    return bool(numpy.logical_or.reduceat(digits, starts).all())
+
+
+def _read(text, values):
+    """
+        Reads 'values' comma separated numbers from text, which has
+        only number characters, commas and whitespace left. Returns
+        None if numpy would read something else than Python.
+    """
+    if not _all_have_digits(text):
+        return None
+
+    dtype = float if text.translate(None, _not_float) else numpy.int64
+
+    # fromstring stops quietly at anything it cannot read. A trailing
+    # sentinel makes sure that is noticed in the last number too
+    array = numpy.fromstring(text + ",0", dtype=dtype, sep=",")
+
+    if len(array) != values + 1:
+        return None
+
+    array = array[:-1]
+
+    # Integers out of range are clamped, not reported
+    if dtype is numpy.int64 and len(array) and (array.max() == _int64.max or array.min() == _int64.min):
+        return None
+    return array
+
+
+def _strip_list(text):
+    # One trailing comma is allowed, but not on its own
+    inner = text[1:-1].strip()
+    if inner.endswith(",") and inner != ",":
+        inner = inner[:-1]
+    return inner
+
+
+def parse_array(text):
+    """
+        Parses the string value of a list from an ANN script.
+
+        Returns a 1-d numpy array for a list of numbers, an (n x 2) array
+        for a list of pairs, and the plain Python value for any other
+        literal. Raises ValueError if the text is not a literal.
+    """
+    text = text.strip()
+
+    if isinstance(text, str) and text.startswith("[") and text.endswith("]"):
+        inner = _strip_list(text)
+
+        if not inner:
+            return numpy.zeros(0)
+
+        if _only(inner, _number_chars):
+            array = _read(inner, inner.count(",") + 1)
+            if array is not None:
+                return array
+
+        elif _only(inner, _number_chars + "()"):
+            # Every pair is (a, b), and pairs are separated by commas
+            pairs = inner.count("(")
+            if inner.translate(None, _not_structure) == ",".join(["(,)"] * pairs):
+                array = _read(inner.replace("(", " ").replace(")", " "), 2 * pairs)
+                if array is not None:
+                    return array.reshape(-1, 2)
+
+    try:
+        return ast.literal_eval(text)
+    except (SyntaxError, ValueError):
+        raise ValueError("Not a literal: %r" % text[:100])
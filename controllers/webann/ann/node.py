@@ -1,3 +1,4 @@
+import numpy
 from arc import Arc
 
 class Node(object):
@@ -7,15 +8,18 @@ class Node(object):
         and the membrane potential.
         Is a part of a layer, and uses that layers activation function to calculate
         the activation level.
+
+        The levels are stored in arrays on the layer, the node is a
+        position in those arrays.
     """
 
-    def __init__(self, layer):
+    __slots__ = ('layer', 'index')
+
+    def __init__(self, layer, index=0):
         self.layer = layer # Set node to be a part of a layer
+        self.index = index # Position in the layer
         self.reset_levels()
 
-        self.incomming = [] # input arcs
-        self.outgoing = [] # output arcs
-
     def reset_levels(self):
         """
             Reset all levels
@@ -24,17 +28,64 @@ class Node(object):
         self._activation_level = 0 # bypass the property func.
         self.prev_activation_level = 0
 
+    @property
+    def incomming(self):
+        """
+            Input arcs, as views into the links entering the layer.
+        """
+        return [Arc(link, i) for link in self.layer.entering for i in link.incoming(self.index)]
+
+    @property
+    def outgoing(self):
+        """
+            Output arcs, as views into the links exiting the layer.
+        """
+        return [Arc(link, i) for link in self.layer.exiting for i in link.outgoing(self.index)]
+
+    @property
+    def membrane_potential(self):
+        return self.layer.membrane_potentials[self.index]
+
+    @membrane_potential.setter
+    def membrane_potential(self, value):
+        self.layer.membrane_potentials[self.index] = value
+
+    @property
+    def _activation_level(self):
+        return self.layer.activation_levels[self.index]
+
+    @_activation_level.setter
+    def _activation_level(self, value):
+        self.layer.activation_levels[self.index] = value
+
+    @property
+    def prev_activation_level(self):
+        return self.layer.prev_activation_levels[self.index]
+
+    @prev_activation_level.setter
+    def prev_activation_level(self, value):
+        self.layer.prev_activation_levels[self.index] = value
+
+    @property
+    def _delta(self):
+        return self.layer.deltas[self.index]
+
+    @_delta.setter
+    def _delta(self, value):
+        self.layer.deltas[self.index] = value
+
     @property
     def activation_level(self):
-        return self._activation_level
+        return self.layer.activation_levels[self.index]
 
     @activation_level.setter
     def activation_level(self, value):
         """
             Used to remember the previous activation level
         """
-        self.prev_activation_level = self._activation_level
-        self._activation_level = value
+        layer, i = self.layer, self.index
+        layer.prev_activation_levels[i] = layer.activation_levels[i]
+        layer.activation_levels[i] = value
 
     def activate(self):
         """
@@ -42,25 +93,28 @@ class Node(object):
             activation function. Calculates the weighted input and
             passes it to the layer.
         """
-        if not self.incomming:
-            return
-
         weighted_input = 0
+        has_input = False
 
-        for arc in self.incomming:
-            con_node = arc.pre_node # connecting node
-            if not con_node.layer.active:
+        for link in self.layer.entering:
+            arcs = link.incoming(self.index)
+            if not len(arcs):
                 continue
 
-            if con_node.layer is self.layer:
-                weighted_input += con_node.prev_activation_level * arc.current_weight
-            else:
-                weighted_input += con_node.activation_level * arc.current_weight 
-
-        self.membrane_potential = weighted_input
-        self.activation_level = self.layer.activation_function(self.membrane_potential)
+            has_input = True
+            pre_layer = link.pre_layer
+            if not pre_layer.active:
+                continue
 
+            if pre_layer is self.layer:
+                levels = pre_layer.prev_activation_levels
+            else:
+                levels = pre_layer.activation_levels
 
+            weighted_input += float(numpy.dot(link.current_weights[arcs], levels[link.pre_index[arcs]]))
 
+        if not has_input:
+            return
 
-        
+        self.membrane_potential = weighted_input
+        self.activation_level = self.layer.activation_function(self.membrane_potential)
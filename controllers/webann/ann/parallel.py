@@ -0,0 +1,207 @@
+import random
+import numpy
+import multiprocessing
+from parser import AnnParser
+from dataset import load_dataset
+from training import Trainer, BatchBackprop
+
+
+def _train_job(job):
+    """
+        Worker: build one network from its config and train it on the
+        memory mapped data set.
+    """
+    index, config, dataset, epochs, seed, trainer_args = job
+
+    # Forked workers share the parent's random state, reseed each one
+    if seed is None:
+        numpy.random.seed()
+        random.seed()
+    else:
+        numpy.random.seed(seed + index)
+        random.seed(seed + index)
+
+    inputs, targets = load_dataset(dataset)
+
+    # Not from the cache, every worker draws its own weights
+    ann = AnnParser(config).create_ann(cache=False)
+    ann.set_learning_mode()
+
+    trainer = Trainer(ann, verbose=False, seed=None if seed is None else seed + index, **trainer_args)
+    history = trainer.run(inputs, targets, epochs)
+    ann.set_testing_mode()
+
+    return {
+        'config': config,
+        'weights': [link.export_weights() for link in ann.links],
+        'arcs': [link.export_arcs() for link in ann.links],
+        'error': trainer.test(numpy.asarray(inputs), numpy.asarray(targets)),
+        'epochs': len(history),
+        'history': history
+    }
+
+
+def train_networks(configs, dataset, epochs=100, processes=None, seed=None, **trainer_args):
+    """
+        Train independent networks in a pool of worker processes.
+
+        'configs' is a list of ANN script file names or RawConfigParser
+        objects, and 'dataset' the name of a data file. The data file is
+        cached once here (see load_dataset), and every worker memory maps
+        the cache, so the data is not pickled to the workers. Other
+        keyword arguments are passed on to Trainer.
+
+        Returns one dict per config, in order, with the exported weights
+        and arcs of every link and the mean squared error on the data set.
+    """
+    load_dataset(dataset)
+
+    jobs = [(i, config, dataset, epochs, seed, trainer_args) for i, config in enumerate(configs)]
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        return pool.map(_train_job, jobs, chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _data_parallel_worker(ann, inputs, targets, shared_weights, shared_deltas, slot, conn):
+    """
+        Worker: holds a replica of the network (inherited by fork) and
+        computes weight changes for the samples it is sent.
+    """
+    backprop = BatchBackprop(ann, None)
+
+    weights = numpy.ctypeslib.as_array(shared_weights)
+    deltas = numpy.ctypeslib.as_array(shared_deltas).reshape(-1, len(weights))[slot]
+    offsets = _offsets(ann)
+
+    while True:
+        index = conn.recv()
+        if index is None:
+            break
+
+        # Take the weights of the last step
+        for link, start, stop in offsets:
+            link.current_weights[:] = weights[start:stop]
+        backprop.engine.build_weights()
+
+        deltas[:] = 0
+        error = 0.0
+        if len(index):
+            changes, error = backprop.deltas(inputs[index], targets[index])
+            for link, start, stop in offsets:
+                if link in changes:
+                    deltas[start:stop] = changes[link]
+
+        conn.send(error)
+
+    conn.close()
+
+
+def _offsets(ann):
+    # Position of every link's weights in the flat weight buffer
+    offsets = []
+    start = 0
+    for link in ann.links:
+        stop = start + len(link.current_weights)
+        offsets.append((link, start, stop))
+        start = stop
+
+    return offsets
+
+
+class DataParallelTrainer(object):
+    """
+        Data parallel back propagation. Every worker process holds a
+        replica of the network and computes the weight changes for its
+        shard of each batch. The changes are averaged over shared memory
+        buffers, weighted by shard size, and applied to every link, so a
+        step is the same as a BatchBackprop step on the whole batch.
+    """
+
+    def __init__(self, ann, workers=None, batch_size=None):
+        ann.init_nodes()
+
+        self.ann = ann
+        self.workers = workers or multiprocessing.cpu_count()
+        self.batch_size = batch_size
+
+        self.offsets = _offsets(ann)
+        self.size = self.offsets[-1][2] if self.offsets else 0
+
+        # Seconds a worker gets to stop by itself when training ends
+        self.timeout = 5.0
+
+    def train(self, inputs, targets, epochs=1):
+        """
+            Train for a number of epochs, going through the data in
+            order, in batches. Returns the summed squared error of
+            every epoch.
+        """
+        inputs = numpy.atleast_2d(numpy.asarray(inputs, dtype=float))
+        targets = numpy.atleast_2d(numpy.asarray(targets, dtype=float))
+
+        shared_weights = multiprocessing.RawArray('d', max(self.size, 1))
+        shared_deltas = multiprocessing.RawArray('d', max(self.size, 1) * self.workers)
+
+        weights = numpy.ctypeslib.as_array(shared_weights)[:self.size]
+        deltas = numpy.ctypeslib.as_array(shared_deltas).reshape(self.workers, -1)[:, :self.size]
+
+        for link, start, stop in self.offsets:
+            weights[start:stop] = link.current_weights
+
+        # The workers get the network and the data by fork, not pickling
+        pipes, processes = [], []
+        for slot in range(self.workers):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_data_parallel_worker,
+                args=(self.ann, inputs, targets, shared_weights, shared_deltas, slot, child))
+            process.daemon = True
+            process.start()
+            pipes.append(parent)
+            processes.append(process)
+
+        errors = []
+        size = self.batch_size or len(inputs)
+        try:
+            for epoch in range(epochs):
+                error = 0.0
+
+                for start in range(0, len(inputs), size):
+                    shards = numpy.array_split(numpy.arange(start, min(start + size, len(inputs))), self.workers)
+
+                    for pipe, shard in zip(pipes, shards):
+                        pipe.send(shard)
+
+                    error += sum(pipe.recv() for pipe in pipes)
+
+                    # Average of the shard means, weighted by shard size
+                    counts = numpy.array([len(shard) for shard in shards], dtype=float)
+                    weights += counts.dot(deltas) / counts.sum()
+
+                errors.append(error)
+
+        finally:
+            for pipe in pipes:
+                try:
+                    pipe.send(None)
+                except (IOError, OSError):
+                    # The worker has died, keep the error that stopped the loop
+                    pass
+                pipe.close()
+
+            for process in processes:
+                process.join(self.timeout)
+                if process.is_alive():
+                    process.terminate()
+                    process.join()
+
+        for link, start, stop in self.offsets:
+            link.current_weights[:] = weights[start:stop]
+
+        if self.ann.engine is not None:
+            self.ann.engine.build_weights()
+
+        return errors
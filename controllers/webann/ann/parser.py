@@ -1,9 +1,14 @@
+import os
+import hashlib
 import ConfigParser
+import numpy
 from functools import wraps, partial
 from layer import *
 from link import *
 from ann import Ann
 from ann_modules import *
+from snapshot import Snapshot, save_snapshot, VERSION as SNAPSHOT_VERSION
+from literal import parse_array
 
 
 funcs = {
@@ -29,6 +34,8 @@ def fail(fn):
     def wrapper_fn(self, section, key, default):
         try:
             tmp = fn(self, section, key, default)
+            if isinstance(tmp, numpy.ndarray):
+                return tmp if tmp.size else None
             if tmp == "None" or not(tmp):
                 return None
             return tmp
@@ -40,8 +47,18 @@ def fail(fn):
 class AnnParser(object):
 
     def __init__(self, filename):
-        self.config = ConfigParser.RawConfigParser()
-        self.config.read(filename)
+        # Either a script file name or an already read config
+        if isinstance(filename, ConfigParser.RawConfigParser):
+            self.config = filename
+            self.filename = None
+            self.directory = ""
+        else:
+            self.filename = filename
+            self.config = ConfigParser.RawConfigParser()
+            self.config.read(filename)
+            self.directory = os.path.dirname(filename)
+
+        self.snapshots = {} # Loaded weight snapshots, by path
 
         self.layer_sections = [s for s in self.config.sections() if s.startswith("Layer")]
         self.link_sections = [s for s in self.config.sections() if s.startswith("Link")]
@@ -102,7 +119,7 @@ class AnnParser(object):
     @fail
     def get_array(self, section, key, default):
         str_repr = self.config.get(section, key)
-        return eval(str_repr)
+        return parse_array(str_repr)
 
 
     def get_layer(self, layers, section, key):
@@ -152,15 +169,56 @@ class AnnParser(object):
         learning_rate = self.get_float(section, "learning_rate", 0.2)
         learning_rule = self.get_rule(section, "learning_rule", LearningRule.general_hebb)
         arc_range = self.get_array(section, "arc_range", [-0.1, 0.1])
+
         weights = self.get_array(section, "weights", None)
         arcs = self.get_array(section, "arcs", None)
 
-        return Link(pre, post, topology, arc_range, learning_rate, weights, arcs, learning_rule)
+        link = Link(pre, post, topology, arc_range, learning_rate, weights, arcs, learning_rule)
+
+        snapshot = self.get_string(section, "snapshot", None)
+        if snapshot:
+            # Arcs and weights are stored in a binary snapshot file, and
+            # mapped from it when the arcs are generated
+            index = self.get_int(section, "snapshot_link", 0) or 0
+            kind = self.get_string(section, "snapshot_weights", "weights")
+            if kind not in ("weights", "init_weights"):
+                raise ValueError("snapshot_weights of %s is not weights or init_weights" % section)
+            link.snapshot = (self.get_snapshot(snapshot), index, kind)
+
+        return link
+
+    def get_snapshot(self, path):
+        path = os.path.join(self.directory, path)
+        if path not in self.snapshots:
+            self.snapshots[path] = Snapshot(path)
+        return self.snapshots[path]
 
     def parse_execution_order(self):
         return self.get_array("Execution Order", "order", [])
 
-    def create_ann(self):
+    def create_ann(self, cache=False):
+        """
+            Build the ANN described by the script.
+
+            With cache set, and the script read from a file, the
+            initialised network is saved as a snapshot next to the script
+            (see cache_name). Later calls with an unchanged script, and
+            unchanged snapshot files referenced from it, restore the arcs
+            and weights from there instead of generating them again, so
+            random topologies and weights stay the same between runs,
+            whatever the state of the random generators. Off by default.
+        """
+        ann = self.build_ann()
+
+        if cache and self.filename:
+            ann = self.load_cached(ann)
+
+        return ann
+
+    def build_ann(self):
+        """
+            A new, not initialised Ann with fresh layers and links.
+        """
         self.extract_layers()
 
         self.extract_modules()
@@ -169,6 +227,58 @@ class AnnParser(object):
 
         return Ann(self.layers, self.links, self.parse_execution_order())
 
+    @staticmethod
+    def cache_name(filename):
+        return filename + ".cache"
+
+    def cache_key(self):
+        """
+            Hash of the script text and the snapshot files it refers to.
+        """
+        key = hashlib.sha1()
+        key.update("snapshot %i\n" % SNAPSHOT_VERSION)
+
+        with open(self.filename, 'rb') as f:
+            key.update(f.read())
+
+        # Referenced snapshots can be large, so go by size and time
+        for section in self.link_sections:
+            snapshot = self.get_string(section, "snapshot", None)
+            if snapshot:
+                stat = os.stat(os.path.join(self.directory, snapshot))
+                key.update("%s %i %r\n" % (snapshot, stat.st_size, stat.st_mtime))
+
+        return key.hexdigest()
+
+    def load_cached(self, ann):
+        """
+            Initialise 'ann' from the cache, or build it and write the
+            cache. Returns the initialised Ann, which is a new one when
+            a broken cache left 'ann' half initialised.
+        """
+        cached = AnnParser.cache_name(self.filename)
+        key = self.cache_key()
+
+        if os.path.exists(cached):
+            try:
+                snapshot = Snapshot(cached)
+                if snapshot.extra and snapshot.extra.get('key') == key:
+                    snapshot.restore(ann)
+                    return ann
+            except Exception:
+                # Broken or truncated cache, build it again from scratch,
+                # the failed restore may have changed the layers and links
+                ann = self.build_ann()
+
+        ann.init_nodes()
+
+        try:
+            save_snapshot(ann, cached, extra={'key': key})
+        except (IOError, OSError):
+            pass # Read only location, use the built network
+
+        return ann
+
     @staticmethod
     def reverse_func_lookup(fn):
 
@@ -188,14 +298,14 @@ class AnnParser(object):
         return None
 
     @staticmethod
-    def insert_link(cfg, link, i, use_updated_values = False):
+    def insert_link(cfg, link, i, use_updated_values = False, snapshot = None):
         section = 'Link %s' % i
         cfg.add_section(section)
 
-        cfg.set(section, 'arc_range', str(link.arc_range))
+        cfg.set(section, 'arc_range', numpy.asarray(link.arc_range).tolist())
 
         if link.learning_rule:
-            cfg.set(section, 'learning_rule', reverse_rule_lookup(link.learning_rule))
+            cfg.set(section, 'learning_rule', AnnParser.reverse_rule_lookup(link.learning_rule))
 
         if link.learning_rate:
             cfg.set(section, 'learning_rate', link.learning_rate)
@@ -203,18 +313,29 @@ class AnnParser(object):
         if link.topology:
             cfg.set(section, 'topology', link.topology)
 
-        
-        if use_updated_values:
-            cfg.set(section, 'weights', link.export_weights())
+        if snapshot:
+            # Arcs and weights are in the snapshot file
+            cfg.set(section, 'snapshot', snapshot)
+            cfg.set(section, 'snapshot_link', i)
+            cfg.set(section, 'snapshot_weights', 'weights' if use_updated_values else 'init_weights')
 
-        elif link.init_weights or use_updated_values:
-            cfg.set(section, 'weights', link.init_weights)
-
-        if use_updated_values:
+        elif link.snapshot is not None and link.initial_weights is not None and not use_updated_values:
+            # Came from a snapshot, which held the initial arcs and weights
+            cfg.set(section, 'weights', numpy.asarray(link.initial_weights).tolist())
             cfg.set(section, 'arcs', link.export_arcs())
 
-        elif link.init_arcs:
-            cfg.set(section, 'arcs', link.init_arcs)
+        else:
+            if use_updated_values:
+                cfg.set(section, 'weights', link.export_weights())
+
+            elif link.init_weights is not None and len(link.init_weights):
+                cfg.set(section, 'weights', numpy.asarray(link.init_weights).tolist())
+
+            if use_updated_values:
+                cfg.set(section, 'arcs', link.export_arcs())
+
+            elif link.init_arcs is not None and len(link.init_arcs):
+                cfg.set(section, 'arcs', [tuple(arc) for arc in numpy.asarray(link.init_arcs).tolist()])
 
         cfg.set(section, 'post', link.post_layer.name)
         cfg.set(section, 'pre', link.pre_layer.name)
@@ -264,9 +385,19 @@ class AnnParser(object):
 
 
     @staticmethod
-    def export(ann, filename, use_updated_values = False):
+    def export(ann, filename, use_updated_values = False, snapshot = None):
+        """
+            Write the ANN to an INI script. With 'snapshot', the arcs and
+            weights of the links are written to that binary snapshot file
+            (see snapshot.py) instead, and the INI refers to it.
+        """
         config = ConfigParser.RawConfigParser()
 
+        if snapshot:
+            save_snapshot(ann, snapshot)
+            # Refer to the snapshot relative to the INI file
+            snapshot = os.path.relpath(snapshot, os.path.dirname(os.path.abspath(filename)))
+
         for layer in ann.layers:
             if hasattr(layer, "links"):
                 AnnParser.insert_inhibitory(config, layer)
@@ -274,7 +405,7 @@ class AnnParser(object):
                 AnnParser.insert_layer(config, layer)
 
         for i, link in enumerate(ann.links):
-            AnnParser.insert_link(config, link, i, use_updated_values)
+            AnnParser.insert_link(config, link, i, use_updated_values, snapshot)
         
         AnnParser.insert_execution_order(config, ann.execution_order)
 
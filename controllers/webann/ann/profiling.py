@@ -0,0 +1,97 @@
+"""
+    Timing of the parts of an Ann.
+
+    A Profiler keeps the number of calls and the cumulative time of every
+    layer update, settling round, link learn and link backprop step. It is
+    turned on per network with Ann.enable_profiling, and the code paths
+    only check whether ann.profiler is None when it is off.
+
+    Named profiling, not profile, so it does not hide the profile
+    module of the standard library.
+"""
+
+import json
+from timeit import default_timer as clock
+
+
+def name_of(item):
+    if isinstance(item, tuple):
+        # A settling round of a layer
+        layer, round = item
+        return "%s round %i" % (name_of(layer), round + 1)
+    if hasattr(item, 'pre_layer'):
+        return "%s -> %s" % (item.pre_layer.name, item.post_layer.name)
+    return str(getattr(item, 'name', item))
+
+
+class Profiler(object):
+
+    clock = staticmethod(clock)
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        # (kind, item) -> [name, calls, seconds], and the order they came in
+        self.stats = {}
+        self.order = []
+
+    def add(self, kind, item, seconds, calls=1):
+        key = (kind, item)
+        entry = self.stats.get(key)
+
+        if entry is None:
+            entry = self.stats[key] = [name_of(item), 0, 0.0]
+            self.order.append(key)
+
+        entry[1] += calls
+        entry[2] += seconds
+
+    def add_layer(self, layer, seconds):
+        """
+            Record one update of a layer.
+        """
+        self.add("update", layer, seconds)
+
+    def add_round(self, layer, round, seconds):
+        """
+            Record settling round number 'round' (from 0) of a layer
+            in quiescent mode. Every round number is kept apart, so the
+            calls of round n are the updates that needed n rounds or more.
+        """
+        self.add("settle", (layer, round), seconds)
+
+    def rows(self):
+        """
+            Returns (kind, name, calls, seconds) for everything recorded,
+            the slowest first.
+        """
+        rows = [(kind, self.stats[(kind, item)][0]) + tuple(self.stats[(kind, item)][1:])
+                    for kind, item in self.order]
+        return sorted(rows, key=lambda row: -row[3])
+
+    def as_dict(self):
+        return {'timings': [{'kind': kind, 'name': name, 'calls': calls, 'seconds': seconds}
+                                for kind, name, calls, seconds in self.rows()]}
+
+    def to_json(self, filename=None):
+        """
+            The timings as JSON, written to 'filename' if given.
+        """
+        text = json.dumps(self.as_dict(), indent=2)
+        if filename:
+            with open(filename, 'w') as f:
+                f.write(text)
+        return text
+
+    def report(self):
+        """
+            The timings as a table.
+        """
+        lines = ["%-8s %-28s %10s %12s %14s" % ("kind", "name", "calls", "total (ms)", "per call (us)")]
+
+        for kind, name, calls, seconds in self.rows():
+            per_call = seconds / calls * 1e6 if calls else 0.0
+            lines.append("%-8s %-28s %10i %12.3f %14.2f" % (kind, name[:28], calls, seconds * 1000, per_call))
+
+        return "\n".join(lines)
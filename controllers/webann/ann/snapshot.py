@@ -0,0 +1,219 @@
+"""
+    Binary weight snapshots.
+
+    Layout of a snapshot file:
+
+        8 bytes   magic, "ANNSNAP\0"
+        4 bytes   format version, little endian uint32
+        4 bytes   header length, little endian uint32
+        header    JSON: layers, links and where their arrays are
+        arrays    raw little endian arrays, each aligned to 16 bytes
+
+    Every link stores int32 pre and post node indices and its current
+    and initial weights as float64 (or float32). The arrays are memory
+    mapped when loaded, so large links are not read before they are used.
+    Restored links keep the float64 and int32 arrays as they are mapped,
+    copy on write, so learning changes the weights in memory, never in
+    the file, and only the pages it changes are copied.
+"""
+
+import os
+import json
+import struct
+import tempfile
+import numpy
+
+MAGIC = b"ANNSNAP\0"
+VERSION = 1
+ALIGN = 16
+
+
+def _align(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def save_snapshot(ann, filename, dtype='<f8', extra=None):
+    """
+        Write the topology, arc indices and weights of all links of
+        an initialised Ann to a snapshot file. 'extra' is stored as is
+        in the header, and must be JSON serializable.
+    """
+    ann.init_nodes()
+    dtype = numpy.dtype(dtype)
+
+    arrays = []
+    links = []
+    for link in ann.links:
+        entry = {
+            'pre': link.pre_layer.name,
+            'post': link.post_layer.name,
+            'arcs': len(link.pre_index)
+        }
+
+        for key, array, kind in (('pre_index', link.pre_index, '<i4'),
+                                 ('post_index', link.post_index, '<i4'),
+                                 ('weights', link.current_weights, dtype),
+                                 ('init_weights', link.initial_weights, dtype)):
+            array = numpy.ascontiguousarray(array, dtype=kind)
+            entry[key] = {'dtype': array.dtype.str, 'offset': None}
+            arrays.append((entry[key], array))
+
+        links.append(entry)
+
+    position = dict((link, i) for i, link in enumerate(ann.links))
+
+    header = {
+        'layers': [{'name': l.name, 'nodes': len(l.nodes)} for l in ann.layers],
+        'links': links,
+        'link_order': [position[link] for link in ann.link_order_learn],
+        'extra': extra
+    }
+
+    # Offsets depend on the header size, which depends on the offsets,
+    # so reserve enough room for the numbers first
+    for spec, array in arrays:
+        spec['offset'] = 10 ** 15
+    start = _align(16 + len(json.dumps(header)))
+
+    offset = start
+    for spec, array in arrays:
+        spec['offset'] = offset
+        offset = _align(offset + array.nbytes)
+
+    text = json.dumps(header)
+    text += " " * (start - 16 - len(text))
+
+    def write(f):
+        f.write(MAGIC)
+        f.write(struct.pack('<II', VERSION, len(text)))
+        f.write(text.encode('utf-8'))
+
+        for spec, array in arrays:
+            f.write(b"\0" * (spec['offset'] - f.tell()))
+            f.write(array.tostring())
+
+    write_atomic(filename, write)
+
+
+def write_atomic(filename, write):
+    """
+        Calls write(f) with a file opened for binary writing next to
+        'filename', and renames it over 'filename' when complete, so
+        readers never see a half written file.
+    """
+    directory, name = os.path.split(os.path.abspath(filename))
+    fd, temporary = tempfile.mkstemp(prefix=name + ".", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+
+        # mkstemp makes the file private, give it the usual permissions
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temporary, 0o666 & ~umask)
+
+        _replace(temporary, filename)
+    except:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def _replace(source, target):
+    try:
+        os.rename(source, target)
+    except OSError:
+        # Windows does not rename over an existing file
+        if not os.path.exists(target):
+            raise
+        os.remove(target)
+        os.rename(source, target)
+
+
+class Snapshot(object):
+    """
+        A loaded snapshot. The arrays of every link are memory mapped
+        on access, copy on write by default (see numpy.memmap for the
+        other modes, None reads them into memory).
+    """
+
+    def __init__(self, filename, mmap_mode='c'):
+        self.filename = filename
+        self.mmap_mode = mmap_mode
+
+        with open(filename, 'rb') as f:
+            magic = f.read(len(MAGIC))
+            if magic != MAGIC:
+                raise ValueError("%s is not an ANN snapshot" % filename)
+
+            version, length = struct.unpack('<II', f.read(8))
+            if version > VERSION:
+                raise ValueError("Snapshot version %i of %s is not supported" % (version, filename))
+
+            header = json.loads(f.read(length).decode('utf-8'))
+
+        self.layers = header['layers']
+        self.links = header['links']
+        self.link_order = header.get('link_order')
+        self.extra = header.get('extra')
+
+    def array(self, spec, size):
+        if not size:
+            return numpy.zeros(0, dtype=spec['dtype'])
+
+        if self.mmap_mode is None:
+            with open(self.filename, 'rb') as f:
+                f.seek(spec['offset'])
+                return numpy.fromfile(f, dtype=spec['dtype'], count=size)
+
+        return numpy.memmap(self.filename, dtype=spec['dtype'], mode=self.mmap_mode,
+                            offset=spec['offset'], shape=(size,))
+
+    def load_link(self, link, i, weights='weights', init_weights='init_weights'):
+        """
+            Set the arcs of 'link' to those of link number i, without
+            copying them. 'weights' and 'init_weights' choose which of the
+            stored weights, 'weights' or 'init_weights', become the current
+            and the initial weights of the link. They get a mapping each,
+            so learning never changes the initial weights.
+        """
+        entry = self.links[i]
+        size = entry['arcs']
+
+        link.connect()
+        link.set_arcs(self.array(entry['pre_index'], size), self.array(entry['post_index'], size),
+                      self.array(entry[weights], size), self.array(entry[init_weights], size), copy=False)
+
+    def restore(self, ann):
+        """
+            Load the arcs and weights into the links of an Ann with the
+            same layers and links. An Ann that is not initialised yet is
+            initialised from the snapshot, without generating arcs.
+        """
+        ann.append_intra_layers()
+
+        sizes = dict((l['name'], l['nodes']) for l in self.layers)
+        for layer in ann.layers:
+            if sizes.get(layer.name) != len(layer.nodes):
+                raise ValueError("Layer %s does not match the snapshot" % layer.name)
+
+        if len(ann.links) != len(self.links):
+            raise ValueError("Snapshot has %i links, the network %i" % (len(self.links), len(ann.links)))
+
+        for link, entry in zip(ann.links, self.links):
+            if (link.pre_layer.name, link.post_layer.name) != (entry['pre'], entry['post']):
+                raise ValueError("Snapshot link %s -> %s does not match %s -> %s" % (
+                    entry['pre'], entry['post'], link.pre_layer.name, link.post_layer.name))
+
+        if not ann.initz:
+            ann.init_nodes(self)
+            return
+
+        for i, link in enumerate(ann.links):
+            self.load_link(link, i)
+
+        if self.link_order is not None:
+            ann.link_order_learn = [ann.links[i] for i in self.link_order]
+
+        if ann.engine is not None:
+            ann.engine.load_weights()
@@ -0,0 +1,261 @@
+import time
+import numpy
+from compiled import CompiledAnn
+from layer import Activation
+
+
+class BatchBackprop(object):
+    """
+        Vectorized back propagation over mini-batches. Deltas and
+        weight changes for a whole batch are computed with matrix
+        operations over the links in link_order_learn, and the mean
+        change of the batch is added to the arc weights of the links.
+
+        batch_size = 1 gives incremental learning like Ann.backprop,
+        batch_size = None uses the whole data set as one batch.
+    """
+
+    def __init__(self, ann, batch_size=32):
+        ann.init_nodes()
+
+        self.ann = ann
+        self.batch_size = batch_size
+
+        # Share the engine of a compiled Ann, so both see the same weights
+        self.engine = ann.engine if ann.engine is not None else CompiledAnn(ann)
+
+        self.derivatives = {}
+        for layer in ann.layers:
+            self.derivatives[layer] = Activation.derivative(layer.activation_function)
+
+    def deltas(self, inputs, targets):
+        """
+            Computes the weight change of every arc for a batch.
+
+            Returns the change per link, and the summed squared error
+            of the batch.
+        """
+        engine = self.engine
+        targets = numpy.atleast_2d(numpy.asarray(targets, dtype=float))
+
+        levels = engine.run_batch(inputs)
+        outputs = numpy.concatenate([levels[cl.layer] for cl in engine.decoders], axis=-1)
+
+        # Output error, split over the decoder layers
+        errors = {}
+        start = 0
+        for cl in engine.decoders:
+            errors[cl.layer] = targets[:, start:start + cl.size] - levels[cl.layer]
+            start += cl.size
+
+        node_deltas = {}
+        changes = {}
+        n = float(targets.shape[0])
+        profiler = self.ann.profiler
+
+        for link in self.ann.link_order_learn:
+            if profiler is not None:
+                start = profiler.clock()
+
+            post, pre = link.post_layer, link.pre_layer
+
+            # 1. Delta of the post-synaptic layer, computed once per layer
+            if post not in node_deltas:
+                error = errors.get(post)
+                if error is None:
+                    error = numpy.zeros_like(levels[post])
+
+                node_deltas[post] = self.derivatives[post](levels[post]) * error
+
+            delta = node_deltas[post]
+
+            # 2. Propagate the delta to the pre-synaptic layer
+            if pre is not post and pre not in node_deltas:
+                propagated = engine.kernels[link].backward(delta)
+                if pre in errors:
+                    errors[pre] = errors[pre] + propagated
+                else:
+                    errors[pre] = propagated
+
+            # 3. Mean weight change of every arc over the batch
+            if link.learning_rate:
+                gradient = engine.kernels[link].gradient(delta, levels[pre]) / n
+                changes[link] = link.learning_rate * gradient
+
+            if profiler is not None:
+                profiler.add("backprop", link, profiler.clock() - start)
+
+        return changes, float(((targets - outputs) ** 2).sum())
+
+    def apply(self, changes):
+        """
+            Add weight changes to the arc weights.
+        """
+        for link, change in changes.items():
+            link.current_weights += change
+
+        self.engine.build_weights()
+
+    def step(self, inputs, targets):
+        """
+            Train one batch, returns the summed squared error.
+        """
+        changes, error = self.deltas(inputs, targets)
+        self.apply(changes)
+        return error
+
+    def epoch(self, inputs, targets):
+        """
+            One pass over the data, in batches.
+            Returns the summed squared error.
+        """
+        inputs = numpy.atleast_2d(numpy.asarray(inputs, dtype=float))
+        targets = numpy.atleast_2d(numpy.asarray(targets, dtype=float))
+
+        size = self.batch_size or len(inputs)
+        error = 0.0
+        for start in range(0, len(inputs), size):
+            error += self.step(inputs[start:start + size], targets[start:start + size])
+
+        return error
+
+    def train(self, inputs, targets, epochs=1):
+        """
+            Train for a number of epochs.
+            Returns the error of every epoch.
+        """
+        return [self.epoch(inputs, targets) for i in range(epochs)]
+
+
+class Trainer(object):
+    """
+        Epoch based training on top of Ann.backprop and Ann.test.
+
+        Every epoch goes through the training samples in a new random
+        order. A part of the data is held out for validation, and
+        training stops when the validation error has not improved for
+        'patience' epochs, keeping the best weights seen.
+
+        With a batch_size, the epochs are trained with BatchBackprop
+        instead of one Ann.backprop call per sample.
+    """
+
+    def __init__(self, ann, validation=0.2, patience=10, min_delta=0.0,
+                batch_size=None, shuffle=True, seed=None, verbose=True):
+        ann.init_nodes()
+
+        self.ann = ann
+        self.validation = validation
+        self.patience = patience
+        self.min_delta = min_delta
+        self.shuffle = shuffle
+        self.verbose = verbose
+        self.random = numpy.random.RandomState(seed)
+
+        self.backprop = BatchBackprop(ann, batch_size) if batch_size else None
+        self.history = []
+
+    def split(self, inputs, targets):
+        """
+            Split into training and validation sets, at random.
+        """
+        n = len(inputs)
+        order = self.random.permutation(n)
+        n_valid = int(round(n * self.validation))
+
+        valid, train = order[:n_valid], order[n_valid:]
+        return inputs[train], targets[train], inputs[valid], targets[valid]
+
+    def train_epoch(self, inputs, targets):
+        """
+            One epoch of training, returns the mean squared error.
+        """
+        order = self.random.permutation(len(inputs)) if self.shuffle else numpy.arange(len(inputs))
+
+        if self.backprop is not None:
+            error = self.backprop.epoch(inputs[order], targets[order])
+
+        else:
+            error = 0.0
+            for i in order:
+                output = self.ann.backprop(inputs[i], targets[i])
+                error += ((targets[i] - output) ** 2).sum()
+
+        return error / max(len(inputs), 1)
+
+    def test(self, inputs, targets):
+        """
+            Mean squared error without learning.
+        """
+        if not len(inputs):
+            return None
+
+        if self.backprop is not None:
+            error = ((targets - self.ann.recall_batch(inputs)) ** 2).sum()
+        else:
+            error = sum(self.ann.test(inputs[i], targets[i]) for i in range(len(inputs)))
+
+        return error / len(inputs)
+
+    def get_weights(self):
+        return [link.current_weights.copy() for link in self.ann.links]
+
+    def set_weights(self, weights):
+        for link, w in zip(self.ann.links, weights):
+            link.current_weights[:] = w
+
+        # Compiled matrices are built from the arc weights
+        if self.backprop is not None:
+            self.backprop.engine.build_weights()
+        if self.ann.engine is not None:
+            self.ann.engine.build_weights()
+
+    def run(self, inputs, targets, epochs=100):
+        """
+            Train for at most 'epochs' epochs.
+
+            Returns the history, one dict per epoch with the training
+            and validation error, the wall time and the throughput.
+        """
+        inputs = numpy.atleast_2d(numpy.asarray(inputs, dtype=float))
+        targets = numpy.atleast_2d(numpy.asarray(targets, dtype=float))
+
+        train_in, train_out, valid_in, valid_out = self.split(inputs, targets)
+
+        best, best_weights, waited = None, None, 0
+        self.history = []
+
+        for epoch in range(epochs):
+            t = time.time()
+            train_error = self.train_epoch(train_in, train_out)
+            seconds = time.time() - t
+
+            valid_error = self.test(valid_in, valid_out)
+            error = train_error if valid_error is None else valid_error
+
+            self.history.append({
+                'epoch': epoch,
+                'train_error': train_error,
+                'validation_error': valid_error,
+                'seconds': seconds,
+                'samples_per_sec': len(train_in) / seconds if seconds else float('inf')
+            })
+
+            if self.verbose:
+                print "Epoch %i: train %.5f, validation %s, %.3fs, %.0f samples/s" % (
+                    epoch, train_error, "%.5f" % valid_error if valid_error is not None else "-",
+                    seconds, self.history[-1]['samples_per_sec'])
+
+            if best is None or error < best - self.min_delta:
+                best, best_weights, waited = error, self.get_weights(), 0
+            else:
+                waited += 1
+                if waited >= self.patience:
+                    if self.verbose:
+                        print "No improvement in %i epochs, stopping" % waited
+                    break
+
+        if best_weights is not None:
+            self.set_weights(best_weights)
+
+        return self.history
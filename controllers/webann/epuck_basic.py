@@ -2,8 +2,12 @@
 from controller import *   # controller comes with Webots
 import time                # A Python primitive module
 import math                #   "            "
-import Image               # An extra Python module (that you'll have to download)
+try:
+  import Image             # An extra Python module (that you'll have to download), only needed for get_image
+except ImportError:
+  Image = None
 import imagepro            # A module provided by Keith Downing for this assignment
+from frames import FrameReader
 
 # This is the basic class for controlling an epuck robot in the Webots simulator.  In theory, the
 # same code can also run a physical epuck robot with just the "flip of a switch" - although there are small
@@ -42,12 +46,13 @@ class EpuckBasic (DifferentialWheels):
 # found in the Webots WORLD file associated with an epuck controller.  BE SURE TO CALL THIS or
 # something similar in order to get access to camera and sensor data, along with the timestep.
 
-  def basic_setup(self, tempo = 1.0):
+  def basic_setup(self, tempo = 1.0, frame_buffer = None):
       self.timestep = int(self.getBasicTimeStep()) # Fetched from WorldInfo.basicTimeStep (in the Webots world)
       self.tempo = tempo
       self.enableEncoders(self.timestep)
       self.camera = self.getCamera('camera')
       self.camera.enable(4*self.timestep)
+      self.frames = FrameReader(self.camera, frame_buffer)
       print "Camera width: " , self.camera.getWidth()
       self.dist_sensor_values = [0 for i in range(self.num_dist_sensors)]
       self.dist_sensors = [self.getDistanceSensor('ps'+str(x)) for x in range(self.num_dist_sensors)]  # distance sensors
@@ -237,6 +242,14 @@ class EpuckBasic (DifferentialWheels):
       im = Image.fromstring('RGB',(self.camera.getWidth(), self.camera.getHeight()), strImage)
       return im
 
+# This is the cheaper alternative to get_image: the camera string is wrapped in a numpy array of
+# shape (height, width, 3) without copying it, and no Image object is built.  Pass frame_buffer = True
+# (or a preallocated array) to basic_setup to have every frame copied into one reusable array instead.
+# imagepro.process_snapshot accepts these arrays directly.
+
+  def get_frame(self):
+      return self.frames.read()
+
 # ****** RUN LOOP **********
 
 # You do NOT need to use this particular name (continuous_run), but you'll want to have some sort of
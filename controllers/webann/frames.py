@@ -0,0 +1,35 @@
+# Camera frames as numpy arrays, without building an "Image" object every timestep.
+
+import numpy
+
+# Wraps the raw image string returned by camera.getImage() in a (height, width, bands) array of
+# 8-bit values.  numpy.frombuffer shares the memory of the string, so nothing is copied.  The
+# number of bands is found from the buffer size (3 for RGB).
+#
+# When a preallocated buffer is given (or buffer = True, to allocate one on the first read),
+# every frame is copied into it instead, and the same array is returned each time.
+#
+# Only getImage, getWidth and getHeight are used, so any camera-like object will do.
+
+class FrameReader(object):
+
+  def __init__(self, camera, buffer = None):
+      self.camera = camera
+      self.buffer = buffer
+
+  def shape(self, raw):
+      width, height = self.camera.getWidth(), self.camera.getHeight()
+      return (height, width, len(raw) // (width * height))
+
+  def read(self):
+      raw = self.camera.getImage()
+      frame = numpy.frombuffer(raw, dtype = numpy.uint8).reshape(self.shape(raw))
+
+      if self.buffer is None or self.buffer is False:
+        return frame
+
+      if self.buffer is True or self.buffer.shape != frame.shape:
+        self.buffer = numpy.empty(frame.shape, dtype = numpy.uint8)
+
+      numpy.copyto(self.buffer, frame)
+      return self.buffer
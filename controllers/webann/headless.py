@@ -0,0 +1,379 @@
+"""
+    A pure Python stand-in for the Webots controller module.
+
+    Implements the part of the DifferentialWheels API that EpuckBasic
+    uses: getBasicTimeStep, getMode, getCamera, getDistanceSensor,
+    setSpeed, step and the wheel encoders. The sensor readings come from
+    a backend, either a World (a square arena with round obstacles and a
+    robot moved by its wheel speeds) or a Trace of recorded readings.
+
+    install() puts this module in place of the controller module, so
+    epuck_basic and webann import and run without Webots:
+
+        import headless
+        headless.install(headless.World.random(obstacles=8))
+
+        from webann import WebAnn
+"""
+
+import sys
+import math
+
+import numpy
+
+__all__ = ['DifferentialWheels', 'Camera', 'DistanceSensor']
+
+
+def install(backend):
+    """
+        Use 'backend' for the robots created from now on, and make
+        "from controller import *" import this module.
+    """
+    DifferentialWheels.backend = backend
+    sys.modules['controller'] = sys.modules[__name__]
+    return backend
+
+
+class Device(object):
+
+    def __init__(self, robot, name):
+        self.robot = robot
+        self.name = name
+        self.period = 0
+
+    def getName(self):
+        return self.name
+
+    def enable(self, ms):
+        self.period = int(ms)
+
+    def disable(self):
+        self.period = 0
+
+    def getSamplingPeriod(self):
+        return self.period
+
+
+class DistanceSensor(Device):
+
+    def __init__(self, robot, name):
+        Device.__init__(self, robot, name)
+        self.index = int(name[2:]) # ps0 ... ps7
+
+    def getValue(self):
+        return self.robot.distance_values()[self.index]
+
+
+class Camera(Device):
+    """
+        Renders a new image once every sampling period, like the
+        Webots camera, and returns the last one in between.
+    """
+
+    def __init__(self, robot, name):
+        Device.__init__(self, robot, name)
+        self.image = None
+        self.updated = None
+
+    def getWidth(self):
+        return self.robot.backend.width
+
+    def getHeight(self):
+        return self.robot.backend.height
+
+    def getImage(self):
+        time = self.robot.time
+        if self.image is None or time - self.updated >= self.period:
+            self.image = self.robot.backend.image()
+            self.updated = time
+        return self.image
+
+
+class DifferentialWheels(object):
+    """
+        The robot. Speeds are encoder steps per second, at most
+        max_speed, and the encoders count the steps turned since they
+        were last set.
+    """
+
+    backend = None
+    max_speed = 1000
+
+    def __init__(self):
+        if self.backend is None:
+            raise RuntimeError("No backend for the headless robot, call headless.install first")
+
+        self.time = 0 # ms
+        self.speeds = (0, 0)
+        self.encoders = [0.0, 0.0]
+        self.values = None
+        self.named = {}
+
+    def device(self, name, kind):
+        if name not in self.named:
+            self.named[name] = kind(self, name)
+        return self.named[name]
+
+    def getBasicTimeStep(self):
+        return float(self.backend.timestep)
+
+    def getTime(self):
+        return self.time / 1000.0
+
+    def getMode(self):
+        # 0 is the simulation mode, the robot is never a real one
+        return 0
+
+    def getCamera(self, name):
+        return self.device(name, Camera)
+
+    def getDistanceSensor(self, name):
+        return self.device(name, DistanceSensor)
+
+    def enableEncoders(self, ms):
+        pass
+
+    def disableEncoders(self):
+        pass
+
+    def getLeftEncoder(self):
+        return self.encoders[0]
+
+    def getRightEncoder(self):
+        return self.encoders[1]
+
+    def setEncoders(self, left, right):
+        self.encoders = [float(left), float(right)]
+
+    def setSpeed(self, left, right):
+        clip = lambda speed: max(-self.max_speed, min(self.max_speed, speed))
+        self.speeds = (clip(left), clip(right))
+
+    def distance_values(self):
+        # Read once per step, when a sensor is first asked for
+        if self.values is None:
+            self.values = self.backend.distances()
+        return self.values
+
+    def step(self, ms):
+        """
+            Run the backend for 'ms' milliseconds, one basic timestep at a
+            time. Returns -1 when it has ended, like Webots does when the
+            simulation is stopped.
+        """
+        timestep = self.backend.timestep
+        left, right = self.speeds
+
+        for i in range(max(1, int(round(ms / float(timestep))))):
+            if not self.backend.advance(left, right, timestep):
+                return -1
+
+            self.time += timestep
+            self.encoders[0] += left * timestep / 1000.0
+            self.encoders[1] += right * timestep / 1000.0
+            self.values = None
+
+        return 0
+
+
+class World(object):
+    """
+        A square arena, 'size' meters wide, with round obstacles given as
+        (x, y, radius, (red, green, blue)). The robot has the size, wheels
+        and sensors of an e-puck, and is moved by the speed of its wheels.
+        It stops when it would hit a wall or an obstacle.
+
+        The distance sensors see the nearest wall or obstacle along their
+        direction, and every column of the camera image has the color of
+        what the camera sees in that direction.
+
+        'steps' is the number of timesteps to run, or None to run forever.
+    """
+
+    radius = 0.037
+    wheel_radius = 0.0205
+    axle_length = 0.053
+    encoder_resolution = 159.23 # steps per radian
+
+    # Directions of ps0 ... ps7, counter clockwise from the heading
+    sensor_angles = numpy.array([-0.30, -0.80, -1.57, -2.64, 2.64, 1.57, 0.80, 0.30])
+    sensor_range = 0.07
+    sensor_max = 4095.0
+
+    field_of_view = 0.84
+    wall_color = (128, 128, 128)
+
+    def __init__(self, size=1.0, obstacles=(), pose=None, timestep=32, width=40, height=40, steps=None):
+        self.size = size
+        self.timestep = timestep
+        self.width, self.height = width, height
+        self.steps = steps
+
+        obstacles = list(obstacles)
+        self.centers = numpy.array([o[:2] for o in obstacles], dtype=float).reshape(-1, 2)
+        self.radii = numpy.array([o[2] for o in obstacles], dtype=float)
+        self.colors = numpy.array([self.wall_color] + [o[3] for o in obstacles], dtype=numpy.uint8)
+
+        self.x, self.y, self.heading = pose if pose is not None else (size / 2.0, size / 2.0, 0.0)
+        self.columns = (numpy.arange(width) + 0.5) / width * -self.field_of_view + self.field_of_view / 2
+        self.tick = 0
+
+    @classmethod
+    def random(cls, obstacles=8, size=1.0, seed=0, colors=((0, 200, 0), (200, 0, 0)), **kwargs):
+        """
+            An arena with obstacles of random size, color and place, not
+            covering the robot at the center.
+        """
+        random = numpy.random.RandomState(seed)
+        placed = []
+        while len(placed) < obstacles:
+            radius = random.uniform(0.03, 0.08)
+            x, y = random.uniform(radius, size - radius, 2)
+            if math.hypot(x - size / 2.0, y - size / 2.0) > radius + 2 * cls.radius:
+                placed.append((x, y, radius, colors[random.randint(len(colors))]))
+
+        return cls(size, placed, **kwargs)
+
+    def cast(self, x, y, angles):
+        """
+            Distance along every ray from (x, y) to the nearest wall or
+            obstacle, and what it hits: 0 for a wall, i + 1 for obstacle i.
+            Every ray can start somewhere else when x and y are arrays.
+        """
+        dx, dy = numpy.cos(angles), numpy.sin(angles)
+        x, y = x + numpy.zeros(len(angles)), y + numpy.zeros(len(angles))
+
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            tx = numpy.where(dx > 0, (self.size - x) / dx, numpy.where(dx < 0, -x / dx, numpy.inf))
+            ty = numpy.where(dy > 0, (self.size - y) / dy, numpy.where(dy < 0, -y / dy, numpy.inf))
+
+        hits = [numpy.minimum(tx, ty)]
+
+        if len(self.radii):
+            fx = x[:, numpy.newaxis] - self.centers[:, 0]
+            fy = y[:, numpy.newaxis] - self.centers[:, 1]
+            b = dx[:, numpy.newaxis] * fx + dy[:, numpy.newaxis] * fy
+            c = fx * fx + fy * fy - self.radii ** 2
+            discriminant = b * b - c
+            t = -b - numpy.sqrt(numpy.maximum(discriminant, 0))
+            hits.extend(numpy.where((discriminant >= 0) & (t >= 0), t, numpy.inf).T)
+
+        hits = numpy.array(hits)
+        nearest = hits.argmin(axis=0)
+        return hits[nearest, numpy.arange(len(angles))], nearest
+
+    def distances(self):
+        angles = self.heading + self.sensor_angles
+        x = self.x + self.radius * numpy.cos(angles)
+        y = self.y + self.radius * numpy.sin(angles)
+
+        # The sensors sit on the edge of the robot
+        t = self.cast(x, y, angles)[0]
+        return (self.sensor_max * numpy.maximum(0.0, 1 - t / self.sensor_range)).tolist()
+
+    def image(self):
+        t, nearest = self.cast(self.x, self.y, self.heading + self.columns)
+        return numpy.tile(self.colors[nearest], (self.height, 1, 1)).tostring()
+
+    def free(self, x, y):
+        if not (self.radius <= x <= self.size - self.radius and self.radius <= y <= self.size - self.radius):
+            return False
+        distance = numpy.hypot(self.centers[:, 0] - x, self.centers[:, 1] - y)
+        return bool(numpy.all(distance >= self.radii + self.radius))
+
+    def advance(self, left, right, ms):
+        """
+            Move the robot for 'ms' milliseconds with the given wheel
+            speeds. Returns False when the world has run all its steps.
+        """
+        if self.steps is not None and self.tick >= self.steps:
+            return False
+        self.tick += 1
+
+        dt = ms / 1000.0
+        scale = self.wheel_radius / self.encoder_resolution
+        v_left, v_right = left * scale, right * scale
+
+        speed = (v_left + v_right) / 2
+        turn = (v_right - v_left) / self.axle_length
+
+        if abs(turn) < 1e-9:
+            x = self.x + speed * dt * math.cos(self.heading)
+            y = self.y + speed * dt * math.sin(self.heading)
+        else:
+            r = speed / turn
+            x = self.x + r * (math.sin(self.heading + turn * dt) - math.sin(self.heading))
+            y = self.y - r * (math.cos(self.heading + turn * dt) - math.cos(self.heading))
+
+        if self.free(x, y):
+            self.x, self.y = x, y
+        self.heading = (self.heading + turn * dt) % (2 * math.pi)
+
+        return True
+
+
+class Trace(object):
+    """
+        Distance sensor values and camera images recorded every timestep,
+        played back in order. The wheel speeds do not change them. Record
+        one by running a backend wrapped in a Recorder.
+    """
+
+    def __init__(self, proximities, images, timestep=32, loop=False):
+        self.proximities = numpy.asarray(proximities, dtype=float)
+        self.images = numpy.asarray(images, dtype=numpy.uint8)
+        self.timestep = timestep
+        self.height, self.width = self.images.shape[1:3]
+        self.loop = loop
+        self.tick = 0
+
+    @classmethod
+    def load(cls, filename, loop=False):
+        data = numpy.load(filename)
+        return cls(data['proximities'], data['images'], int(data['timestep']), loop)
+
+    def save(self, filename):
+        numpy.savez_compressed(filename, proximities=self.proximities, images=self.images, timestep=self.timestep)
+
+    def __len__(self):
+        return len(self.proximities)
+
+    def distances(self):
+        return self.proximities[self.tick % len(self)].tolist()
+
+    def image(self):
+        return self.images[self.tick % len(self)].tostring()
+
+    def advance(self, left, right, ms):
+        if self.tick + 1 >= len(self) and not self.loop:
+            return False
+        self.tick += 1
+        return True
+
+
+class Recorder(object):
+    """
+        Wraps a backend, and keeps what its sensors read at every
+        timestep, to be played back as a Trace.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.timestep = backend.timestep
+        self.width, self.height = backend.width, backend.height
+        self.proximities = []
+        self.images = []
+
+    def distances(self):
+        return self.backend.distances()
+
+    def image(self):
+        return self.backend.image()
+
+    def advance(self, left, right, ms):
+        self.proximities.append(self.backend.distances())
+        self.images.append(numpy.frombuffer(self.backend.image(), dtype=numpy.uint8).reshape(self.height, self.width, -1))
+        return self.backend.advance(left, right, ms)
+
+    def trace(self, loop=False):
+        return Trace(self.proximities, self.images, self.timestep, loop)
@@ -1,8 +1,12 @@
 # For simple image-processing operations on python "Image" objects
 
-import Image
-import ImageFilter
+try:
+   import Image
+   import ImageFilter
+except ImportError: # Only needed for the Image object functions, not for pixel arrays
+   Image = ImageFilter = None
 import math
+import numpy
 import kd_array
 
 # These fetch the red, green or blue components of an RGB triple.  A normal Image
@@ -113,28 +117,43 @@ def split_list(li,columns):
     length = len(li)
     return [(sum(li[i*length // columns: (i+1)*length // columns])/(len(li)/columns)) for i in range(columns) ]
 
+# Converts an image to a (height, width, bands) array of 8-bit values.  Arrays are passed through.
+def image_array(image):
+   if isinstance(image, numpy.ndarray):
+      return image
+   return numpy.asarray(image)
+
+# Array version of column_avg for all bands at once: returns a (width, bands) array of averages
+# over the rows in the y scope.  A scope without rows, in short images, gives zeros.
+def column_avgs(pixels,y_scope_to=1,y_scope_from=0):
+   y = pixels.shape[0]
+   from_ = int(math.ceil(y*y_scope_from))
+   to_ = int(math.floor(y*y_scope_to))
+   if to_ <= from_:
+      return numpy.zeros(pixels.shape[1:])
+   return pixels[from_:to_].mean(axis=0)
+
 def process_snapshot(image,columns=5,color='red'):
+    return process_pixels(image_array(image),columns,color)
+
+# Same features as computing column_avg for red, green and blue, but on the whole pixel array at once.
+def process_pixels(pixels,columns=5,color='red'):
 
     cut_top = .4
     cut_bot = .6
 
-    avg_red = column_avg(image,'red',y_scope_from=cut_top,y_scope_to=cut_bot)
-    avg_green= column_avg(image,'green',y_scope_from=cut_top,y_scope_to=cut_bot)
-    avg_blue = column_avg(image,'blue',y_scope_from=cut_top,y_scope_to=cut_bot)
-
-    diff = []
-    for i in range(len(avg_red)):
-
-      if color == 'red':
-        f = (max(0, min(1, ((avg_red[i] - ((avg_blue[i] + avg_green[i]) / 2)) / 90))))
-      elif color == "green":
-        f = (max(0, min(1, ((avg_green[i] - ((avg_blue[i] + avg_red[i]) / 2)) / 90))))
-      else:
-        f = (max(0, min(1, ((avg_blue[i] - ((avg_green[i] + avg_red[i]) / 2)) / 90))))
+    avgs = column_avgs(pixels,y_scope_from=cut_top,y_scope_to=cut_bot)
+    avg_red, avg_green, avg_blue = avgs[:,0], avgs[:,1], avgs[:,2]
 
-      diff.append(f)
+    if color == 'red':
+      diff = (avg_red - ((avg_blue + avg_green) / 2)) / 90
+    elif color == "green":
+      diff = (avg_green - ((avg_blue + avg_red) / 2)) / 90
+    else:
+      diff = (avg_blue - ((avg_green + avg_red) / 2)) / 90
 
-    # diff = [max(0, ((avg_red[i]*rf)+(avg_green[i]*gf)+(avg_blue[i]*bf))/255.0)for i,j in enumerate(avg_red)]
-    output = split_list(diff,columns)
-    return output
+    diff = numpy.clip(diff, 0, 1)
 
+    # Same binning as split_list
+    length = len(diff)
+    return [float(diff[i*length // columns: (i+1)*length // columns].sum()) / (length // columns) for i in range(columns)]
@@ -0,0 +1,144 @@
+"""
+    Latency of the stages of a control loop.
+
+    Every tick of WebAnn.run reads the sensors, processes the camera
+    frame, recalls the ANN and sets the wheel speeds. LoopLatency keeps
+    the time of every stage of every tick, and counts the ticks that took
+    longer than the timestep of the robot. The percentiles and histograms
+    can be printed as a table or written as JSON, usually at shutdown.
+
+    Nothing here needs Webots.
+"""
+
+import json
+from array import array
+from timeit import default_timer as clock
+
+import numpy
+
+
+class LoopLatency(object):
+
+    stages = ('sensors', 'process', 'recall', 'drive')
+    percentiles = (50, 95, 99)
+
+    def __init__(self, timestep, stages=None):
+        """
+            'timestep' is the deadline of a tick in milliseconds, like
+            EpuckBasic.timestep.
+        """
+        self.timestep = timestep
+        self.deadline = timestep / 1000.0
+        if stages is not None:
+            self.stages = tuple(stages)
+        self.reset()
+
+    def reset(self):
+        # Seconds per tick of every stage, and of the whole tick
+        self.samples = dict((stage, array('d')) for stage in self.stages)
+        self.ticks = array('d')
+        self.overruns = 0
+
+    def start(self):
+        """
+            Start a tick.
+        """
+        self.begin = self.last = clock()
+
+    def lap(self, stage):
+        """
+            End a stage, which started at the end of the last stage or
+            at the start of the tick.
+        """
+        now = clock()
+        self.samples[stage].append(now - self.last)
+        self.last = now
+
+    def stop(self):
+        """
+            End a tick, counting an overrun if it took longer than the
+            timestep. The time waiting for the simulator in step() is not
+            part of the tick.
+        """
+        elapsed = self.last - self.begin
+        self.ticks.append(elapsed)
+        if elapsed > self.deadline:
+            self.overruns += 1
+
+    def times(self, stage=None):
+        """
+            Milliseconds per tick of a stage, or of the whole tick.
+        """
+        samples = self.ticks if stage is None else self.samples[stage]
+        return numpy.frombuffer(samples, dtype=float) * 1000 if len(samples) else numpy.zeros(0)
+
+    def summary(self, stage=None):
+        times = self.times(stage)
+        result = {'count': len(times)}
+        if len(times):
+            result['mean'] = times.mean()
+            result['max'] = times.max()
+            for p, value in zip(self.percentiles, numpy.percentile(times, self.percentiles)):
+                result['p%i' % p] = value
+        return result
+
+    def histogram(self, stage=None, bins=None):
+        """
+            Counts of the times of a stage (milliseconds) in logarithmic
+            bins, four per decade, from a microsecond up to ten times the
+            timestep or the slowest time, whichever is larger. Times
+            outside the bins are counted in the first or the last bin,
+            so no tick is left out.
+
+            Returns counts and bin edges.
+        """
+        times = self.times(stage)
+
+        if bins is None:
+            slowest = times.max() if len(times) else 0.0
+            top = numpy.ceil(numpy.log10(max(self.timestep * 10.0, slowest, 1.0)) * 4) / 4
+            bins = numpy.logspace(-3, top, int(round((top + 3) * 4)) + 1)
+
+        bins = numpy.asarray(bins, dtype=float)
+        return numpy.histogram(numpy.clip(times, bins[0], bins[-1]), bins)
+
+    def as_dict(self):
+        result = {'timestep': self.timestep, 'ticks': len(self.ticks), 'overruns': self.overruns,
+                  'stages': {}}
+
+        for stage in (None,) + self.stages:
+            counts, edges = self.histogram(stage)
+            entry = self.summary(stage)
+            entry['histogram'] = {'edges': edges.tolist(), 'counts': counts.tolist()}
+            if stage is None:
+                result['tick'] = entry
+            else:
+                result['stages'][stage] = entry
+
+        return result
+
+    def to_json(self, filename=None):
+        """
+            Summaries and histograms as JSON, written to 'filename' if
+            given. Times are in milliseconds.
+        """
+        text = json.dumps(self.as_dict(), indent=2)
+        if filename:
+            with open(filename, 'w') as f:
+                f.write(text)
+        return text
+
+    def report(self):
+        """
+            The percentiles of every stage as a table, in milliseconds.
+        """
+        columns = ['p%i' % p for p in self.percentiles] + ['max']
+        lines = ["%-8s %8s" % ("stage", "count") + "".join(" %9s" % c for c in columns)]
+
+        for stage in self.stages + (None,):
+            summary = self.summary(stage)
+            line = "%-8s %8i" % (stage or "tick", summary['count'])
+            lines.append(line + "".join(" %9.3f" % summary.get(c, 0.0) for c in columns))
+
+        lines.append("%i of %i ticks over the %i ms timestep" % (self.overruns, len(self.ticks), self.timestep))
+        return "\n".join(lines)
@@ -11,6 +11,7 @@ from ann.link import *
 from ann.ann import Ann
 from ann.parser import AnnParser
 from ann.ann_modules import Inhibitory
+from ann.dataset import load_dataset
 
 import time
 
@@ -24,17 +25,13 @@ epochs = 60
 # Learn
 
 # Read inputs and targets from datafile
-data = []
-
-with open('data/learning.txt', 'r') as f:
-    for line in f.readlines():
-        data.append(eval(line))
+inputs_data, target_data = load_dataset('data/learning.txt')
 
 # Run back-propagation learning
 t = time.time()
 print "Performing %i epochs of back propagation learning" % epochs
 for i in range(epochs):
-    inputs, target = data[i % len(data)]
+    inputs, target = inputs_data[i % len(inputs_data)], target_data[i % len(target_data)]
     ann.back_propagation(inputs, target)
     print [a.current_weight for a in ann.output_nodes[0].incomming]
 
@@ -3,21 +3,32 @@
 
 import epuck_basic as epb
 from imagepro import *
+from latency import LoopLatency
 from ann.ann import Ann
 from ann.parser import AnnParser
+from ann.training import Trainer
+from ann.dataset import load_dataset
 
 # The webann is a descendent of the webot "controller" class, and it has the ANN as an attribute.
 class WebAnn(epb.EpuckBasic):
 
-    def __init__(self, ann, tempo = 1.0):
+    def __init__(self, ann, tempo = 1.0, latency_file = None):
         epb.EpuckBasic.__init__(self)
 
         self.basic_setup() # defined for EpuckBasic 
 
+        # Time of every stage of the main loop, reported at shutdown
+        self.latency = LoopLatency(self.timestep)
+        self.latency_file = latency_file
+
         self.ann = ann
         self.ann.init_nodes()
         self.ann.set_testing_mode()
 
+        # The camera refreshes every few timesteps, so often the inputs
+        # do not change between recalls
+        self.ann.compile(incremental=True)
+
         self.tempo = tempo
 
     def drive_speed(self, left=0, right=0):
@@ -28,11 +39,18 @@ class WebAnn(epb.EpuckBasic):
         self.setSpeed(int(left * ms), int(right * ms))
 
     def run(self):
-        
+        latency = self.latency
+
         while True: # main loop
-            dist = [max(-1, (1 - (i / 600))) for i in self.get_proximities()]
-            cam = process_snapshot(self.snapshot(),color="green")
+            latency.start()
+            proximities = self.get_proximities()
+            frame = self.get_frame()
+            latency.lap('sensors')
+
+            dist = [max(-1, (1 - (i / 600))) for i in proximities]
+            cam = process_snapshot(frame,color="green")
             inputs = dist + cam
+            latency.lap('process')
 
             # print "Distance"
             # print dist
@@ -41,55 +59,68 @@ class WebAnn(epb.EpuckBasic):
             # print cam
 
             wheels = self.ann.recall(inputs)
-            
+            latency.lap('recall')
+
             # print "Drive Speed:"
             # print wheels
 
             self.drive_speed(*wheels)
+            latency.lap('drive')
+            latency.stop()
 
             if self.step(self.timestep) == -1: break
 
+        self.shutdown()
+
+    def shutdown(self):
+        """
+            Print the latency of the main loop, and write it as JSON to
+            latency_file if one was given.
+        """
+        print self.latency.report()
+
+        if self.latency_file:
+            self.latency.to_json(self.latency_file)
+
 class BackProp(WebAnn):
     """
         Off-line training of robot with back propagation.
         Reading from a file with targets.
     """
 
-    def __init__(self, ann, tempo = 1.0, training_file = 'data/learning.txt', epochs=5000):
+    def __init__(self, ann, tempo = 1.0, training_file = 'data/learning.txt', epochs=100, batch_size=16):
 
         super(BackProp, self).__init__(ann, tempo)
 
+        self.batch_size = batch_size
+
         self.ann.set_learning_mode()
         self.get_data(training_file)
         self.do_prop(epochs)
         self.ann.set_testing_mode()
 
     def get_data(self, training_file):
-        self.data = []
-
-        with open(training_file, 'r') as f:
-            for line in f.readlines():
-                self.data.append(eval(line))
+        self.inputs, self.targets = load_dataset(training_file)
 
 
-    def do_prop(self, epochs=1):        
+    def do_prop(self, epochs=1):
         print "Training robot using back propagation"
 
-        for i in range(epochs):
-            inputs, target = self.data[i % len(self.data)]
-            # Do prop
-            self.ann.backprop(inputs, target)
+        # Shuffled epochs in mini-batches, stopping when the validation error stops improving
+        Trainer(self.ann, batch_size=self.batch_size).run(self.inputs, self.targets, epochs)
 
         print "Done using back propagation\nRun robot! Run!"
 
 
-ann = AnnParser("ann/scripts/ann.ini").create_ann()
+if __name__ == "__main__":
+
+    ann = AnnParser("ann/scripts/ann.ini").create_ann(cache=True)
 
 
-controller = WebAnn(ann)
-# controller = BackProp(ann)
+    controller = WebAnn(ann)
+    # controller = BackProp(ann)
 
-for i in ann.output_nodes:
-    for j in i.incomming:
-        print j.current_weight
-controller.run()
+    for i in ann.output_nodes:
+        for j in i.incomming:
+            print j.current_weight
+    controller.run()
@@ -0,0 +1,67 @@
+"""
+    Array activation functions against the scalar ones.
+
+    Run from the top directory with: python -m unittest discover tests
+"""
+import unittest
+import numpy
+from functools import partial
+
+from controllers.webann.ann.layer import Layer, Activation
+
+INPUTS = numpy.array([-1000.0, -50.0, -1.0, -1e-9, 0.0, 1e-9, 0.3, 0.5, 1.0, 50.0, 1000.0])
+
+
+class ActivationTest(unittest.TestCase):
+
+    def compare(self, fn):
+        expected = [fn(x) for x in INPUTS]
+
+        # Underflow to 0 is fine, overflow is not
+        with numpy.errstate(over='raise', invalid='raise'):
+            levels = Activation.kernel(fn)(INPUTS)
+
+        self.assertTrue(numpy.allclose(levels, expected, rtol=1e-15, atol=0))
+
+    def test_functions(self):
+        for fn in (Activation.sigmoid_log, Activation.sigmoid_tanh, Activation.step,
+                   Activation.linear, Activation.pos_linear):
+            self.compare(fn)
+
+    def test_step_threshold(self):
+        self.compare(partial(Activation.step, T=0.3))
+        self.compare(partial(Activation.step, T=0.0))
+
+    def test_unregistered(self):
+        self.compare(lambda x: 2 * x)
+
+    def test_derivatives(self):
+        x = numpy.linspace(-3, 3, 25)
+        h = 1e-6
+
+        for fn in (Activation.sigmoid_log, Activation.sigmoid_tanh, Activation.linear):
+            kernel = Activation.kernel(fn)
+            numeric = (kernel(x + h) - kernel(x - h)) / (2 * h)
+            self.assertTrue(numpy.allclose(Activation.derivative(fn)(kernel(x)), numeric, rtol=0, atol=1e-8))
+
+    def test_unregistered_derivatives(self):
+        levels = numpy.array([-1, 0, 1])
+        step = partial(lambda x, T: 0.0 if x < T else 1.0, T=0.2)
+
+        # Like Layer.derivate before the array versions, 0 for partials
+        for fn, expected in ((step, 0.0), (lambda x: 2 * x, 1.0)):
+            derivatives = Activation.derivative(fn)(levels)
+            self.assertEqual(derivatives.dtype, numpy.float64)
+            self.assertTrue(numpy.array_equal(derivatives, [expected] * 3))
+
+    def test_layer_derivate(self):
+        layer = Layer("Hidden", 6, Activation.sigmoid_tanh)
+        layer.activation_levels[:] = numpy.tanh(numpy.linspace(-2, 2, 6))
+
+        derivatives = layer.derivatives()
+        for node in layer.nodes:
+            self.assertEqual(layer.derivate(node), derivatives[node.index])
+
+
+if __name__ == "__main__":
+    unittest.main()
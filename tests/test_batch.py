@@ -0,0 +1,75 @@
+"""
+    Batched recall against one recall per input.
+
+    Run from the top directory with: python -m unittest discover tests
+"""
+import unittest
+import numpy
+
+from controllers.webann.ann.parser import AnnParser
+from tests.test_compiled import SCRIPT, recurrent_network
+
+
+def save_levels(ann):
+    return [(layer.membrane_potentials.copy(), layer.activation_levels.copy(), layer.prev_activation_levels.copy())
+                for layer in ann.layers]
+
+
+def restore_levels(ann, saved):
+    for layer, (membrane, level, prev) in zip(ann.layers, saved):
+        layer.membrane_potentials[:] = membrane
+        layer.activation_levels[:] = level
+        layer.prev_activation_levels[:] = prev
+
+
+class RecallBatchTest(unittest.TestCase):
+
+    def compare(self, ann):
+        random = numpy.random.RandomState(1)
+        inputs = random.rand(8, len(ann.input_nodes))
+
+        # Start from levels left by an earlier recall
+        ann.recall(random.rand(len(ann.input_nodes)))
+        saved = save_levels(ann)
+
+        batch = ann.recall_batch(inputs)
+        self.assertEqual(batch.shape, (8, len(ann.output_nodes)))
+
+        # The levels are not changed
+        for a, b in zip(save_levels(ann), saved):
+            for level, expected in zip(a, b):
+                self.assertTrue(numpy.array_equal(level, expected))
+
+        # Every row is recalled from the same levels
+        for x, row in zip(inputs, batch):
+            restore_levels(ann, saved)
+            self.assertTrue(numpy.allclose(row, ann.recall(x), rtol=0, atol=1e-9))
+
+    def test_script(self):
+        ann = AnnParser(SCRIPT).create_ann()
+        ann.init_nodes()
+        self.compare(ann)
+
+    def test_recurrent(self):
+        self.compare(recurrent_network())
+
+    def test_compiled(self):
+        ann = recurrent_network()
+        engine = ann.compile()
+
+        random = numpy.random.RandomState(2)
+        inputs = random.rand(8, len(ann.input_nodes))
+        ann.recall(random.rand(len(ann.input_nodes)))
+
+        batch = ann.recall_batch(inputs)
+
+        engine.store_levels()
+        saved = save_levels(ann)
+        for x, row in zip(inputs, batch):
+            restore_levels(ann, saved)
+            engine.load_levels()
+            self.assertTrue(numpy.allclose(row, ann.recall(x), rtol=0, atol=1e-9))
+
+
+if __name__ == "__main__":
+    unittest.main()
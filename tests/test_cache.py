@@ -0,0 +1,119 @@
+"""
+    Built network cache of AnnParser.create_ann.
+
+    Run from the top directory with: python -m unittest discover tests
+"""
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+
+from controllers.webann.ann.parser import AnnParser
+
+SCRIPT = os.path.join(os.path.dirname(__file__), "..", "controllers", "webann", "ann", "scripts", "ann.ini")
+
+# Random weights, unlike ann.ini
+RANDOM_SCRIPT = """
+[Layer Input]
+activation = None
+nodes = 4
+io_type = encoder
+
+[Layer Output]
+activation = tanh
+nodes = 3
+io_type = decoder
+
+[Link 1]
+arc_range = [-1, 1]
+topology = full
+pre = Input
+post = Output
+
+[Execution Order]
+order = ['Input', 'Output']
+"""
+
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.script = os.path.join(self.directory, "ann.ini")
+        shutil.copy(SCRIPT, self.script)
+        self.cached = AnnParser.cache_name(self.script)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def weights(self, ann):
+        ann.init_nodes()
+        return [link.current_weights.copy() for link in ann.links]
+
+    def assertSameWeights(self, a, b):
+        self.assertEqual(len(a), len(b))
+        for x, y in zip(a, b):
+            self.assertTrue(numpy.array_equal(x, y))
+
+    def random_script(self):
+        script = os.path.join(self.directory, "random.ini")
+        with open(script, 'w') as f:
+            f.write(RANDOM_SCRIPT)
+        return script
+
+    def test_cache_restores_weights(self):
+        script = self.random_script()
+        built = AnnParser(script).create_ann(cache=True)
+        self.assertTrue(os.path.exists(AnnParser.cache_name(script)))
+
+        restored = AnnParser(script).create_ann(cache=True)
+        self.assertSameWeights(self.weights(built), self.weights(restored))
+
+    def test_truncated_cache(self):
+        AnnParser(self.script).create_ann(cache=True)
+        size = os.path.getsize(self.cached)
+
+        # In the last arrays, in the header, and in the magic
+        for length in (size - 8, size // 2, 4):
+            with open(self.cached, 'r+b') as f:
+                f.truncate(length)
+
+            ann = AnnParser(self.script).create_ann(cache=True)
+            self.assertTrue(ann.initz)
+            self.assertEqual(len(ann.link_order_learn), len(ann.links))
+            self.assertEqual(len(ann.recall([0.5] * len(ann.input_nodes))), len(ann.output_nodes))
+
+            # Written again, and whole
+            self.assertEqual(os.path.getsize(self.cached), size)
+            self.assertSameWeights(self.weights(ann), self.weights(AnnParser(self.script).create_ann(cache=True)))
+
+    def test_garbage_cache(self):
+        AnnParser(self.script).create_ann(cache=True)
+
+        with open(self.cached, 'r+b') as f:
+            f.seek(20)
+            f.write(b"\xff" * 64)
+
+        ann = AnnParser(self.script).create_ann(cache=True)
+        self.assertTrue(ann.initz)
+        ann.recall([0.5] * len(ann.input_nodes))
+
+    def test_cache_is_opt_in(self):
+        script = self.random_script()
+
+        numpy.random.seed(1)
+        first = self.weights(AnnParser(script).create_ann())
+        numpy.random.seed(2)
+        second = self.weights(AnnParser(script).create_ann())
+
+        self.assertFalse(os.path.exists(AnnParser.cache_name(script)))
+        self.assertFalse(all(numpy.array_equal(x, y) for x, y in zip(first, second)))
+
+    def test_no_temporary_files_left(self):
+        AnnParser(self.script).create_ann(cache=True)
+        self.assertEqual(sorted(os.listdir(self.directory)), ["ann.ini", "ann.ini.cache"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+"""
+    Compiled recall against recall through the node and arc graph.
+
+    Run from the top directory with: python -m unittest discover tests
+"""
+import os
+import unittest
+import numpy
+
+from controllers.webann.ann.layer import Layer, Activation
+from controllers.webann.ann.link import Link
+from controllers.webann.ann.ann import Ann
+from controllers.webann.ann.ann_modules import Competitive
+from controllers.webann.ann.parser import AnnParser
+
+SCRIPT = os.path.join(os.path.dirname(__file__), "..", "controllers", "webann", "ann", "scripts", "ann.ini")
+
+
+def recurrent_network(seed=0):
+    """
+        A quiescent hidden layer with a partial intra layer link and a
+        link back from the output layer, and a competitive layer. The
+        output layer only has input to some of its nodes.
+    """
+    numpy.random.seed(seed)
+
+    source = Layer("Input", 5, io_type='encoder')
+    hidden = Layer("Hidden", 6, Activation.sigmoid_tanh)
+    target = Layer("Output", 4, Activation.sigmoid_tanh, io_type='decoder')
+
+    hidden.quiescent_mode = True
+    hidden.max_settling = 20
+    hidden.settling_tolerance = 1e-6
+
+    competitive = Competitive("Winner", 4, Activation.sigmoid_log, neg=-0.1, pos=0.2,
+        up=Link(hidden, None, 'full', arc_range=[-1, 1]),
+        down=Link(None, target, '1-1', arc_range=[-1, 1]),
+        rounds=20, tolerance=1e-6)
+
+    links = [Link(source, hidden, 'full', arc_range=[-1, 1]),
+             Link(hidden, hidden, 'stochastic', arc_range=[-0.2, 0.2]),
+             Link(target, hidden, 'full', arc_range=[-0.2, 0.2])]
+
+    ann = Ann([source, hidden, competitive, target], links, ["Input", "Hidden", "Winner", "Output"])
+    ann.init_nodes()
+
+    # Not every output node has input
+    competitive.links[-1].set_arcs([0, 1], [0, 2], [0.8, -0.6])
+    return ann
+
+
+def inputs(ann, count, seed=1):
+    x = numpy.random.RandomState(seed).rand(count, len(ann.input_nodes))
+    # Repeated inputs too
+    return numpy.concatenate([x, x[-1:], x[:1]])
+
+
+def run(ann, samples):
+    """
+        The result and the levels of every layer after every recall.
+    """
+    steps = []
+    for x in samples:
+        result = ann.recall(x)
+        if ann.engine is not None:
+            ann.engine.store_levels()
+
+        steps.append((result, [(layer.membrane_potentials.copy(), layer.activation_levels.copy(),
+                                layer.prev_activation_levels.copy(), layer.settling_rounds)
+                                    for layer in ann.layers]))
+    return steps
+
+
+class CompiledTest(unittest.TestCase):
+
+    def assertSameSteps(self, expected, steps):
+        self.assertEqual(len(expected), len(steps))
+
+        for (result, levels), (expected_result, expected_levels) in zip(steps, expected):
+            self.assertTrue(numpy.allclose(result, expected_result, rtol=0, atol=1e-9))
+
+            for level, expected_level in zip(levels, expected_levels):
+                for a, b in zip(level[:3], expected_level[:3]):
+                    self.assertTrue(numpy.allclose(a, b, rtol=0, atol=1e-9))
+                self.assertEqual(level[3], expected_level[3])
+
+    def compare(self, ann, samples):
+        expected = run(ann, samples)
+
+        ann.reset()
+        ann.compile()
+        self.assertSameSteps(expected, run(ann, samples))
+
+    def test_script(self):
+        ann = AnnParser(SCRIPT).create_ann()
+        ann.init_nodes()
+        self.compare(ann, inputs(ann, 20))
+
+    def test_recurrent(self):
+        ann = recurrent_network()
+        samples = inputs(ann, 10)
+        self.compare(ann, samples)
+
+        # The layers settle before max_settling, in different numbers of rounds
+        hidden, winner = ann.layers[1], ann.layers[2]
+        rounds = set()
+        for result, layers in run(ann, samples):
+            rounds.add((layers[1][3], layers[2][3]))
+        self.assertTrue(len(rounds) > 1)
+        self.assertTrue(all(2 < h < hidden.max_settling and 2 < w < winner.max_settling for h, w in rounds))
+
+        # And the intra layer link of the hidden layer is partial
+        self.assertTrue(any(0 < len(link.arcs) < 36 for link in ann.links if link.pre_layer is link.post_layer is hidden))
+
+
+if __name__ == "__main__":
+    unittest.main()
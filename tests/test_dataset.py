@@ -0,0 +1,108 @@
+"""
+    Training data files: sample parsing and the parsed data cache.
+
+    Run from the top directory with: python -m unittest discover tests
+"""
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+
+from controllers.webann.ann import dataset
+from controllers.webann.ann.dataset import parse_sample, load_dataset, cache_name
+
+SAMPLES = "[[0.5, -1, 0], [1, 0.25]]\n\n[[1e-3, 2, -0.5], [-1, 0]]\n"
+
+
+class ParseSampleTest(unittest.TestCase):
+
+    def test_sample(self):
+        self.assertEqual(parse_sample("[[0.5, -1, 0], [1, 0.25]]\n"), ([0.5, -1.0, 0.0], [1.0, 0.25]))
+        self.assertEqual(parse_sample("  [ [1e-3,2] ,[-1] ]  "), ([0.001, 2.0], [-1.0]))
+        self.assertEqual(parse_sample("[[], [1]]"), ([], [1.0]))
+
+    def test_malformed(self):
+        for line in ("", "[1, 2]", "[[1, 2]]", "[[1], [2], [3]]", "[[1] [2]]", "[[1], [2]] x",
+                     "x [[1], [2]]", "[[[1]], [2]]", "[[1, , 2], [3]]", "[[1, a], [2]]",
+                     "[[1,], [2]]", "[[1], [2]],", "[(1, 2), [3]]"):
+            self.assertRaises(ValueError, parse_sample, line)
+
+
+class CacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.filename = os.path.join(self.directory, "learning.txt")
+        self.cached = cache_name(self.filename)
+        self.write(SAMPLES)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, text, mtime=None):
+        with open(self.filename, 'w') as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(self.filename, (mtime, mtime))
+
+    def assertData(self, loaded, text):
+        inputs, targets = loaded
+        samples = [parse_sample(line) for line in text.splitlines() if line.strip()]
+        self.assertTrue(numpy.array_equal(inputs, [s[0] for s in samples]))
+        self.assertTrue(numpy.array_equal(targets, [s[1] for s in samples]))
+
+    def test_cache_is_reused(self):
+        self.assertData(load_dataset(self.filename), SAMPLES)
+        self.assertTrue(os.path.exists(self.cached))
+
+        parse, dataset.parse_dataset = dataset.parse_dataset, None
+        try:
+            inputs, targets = load_dataset(self.filename)
+        finally:
+            dataset.parse_dataset = parse
+
+        self.assertTrue(isinstance(inputs.base, numpy.memmap))
+        self.assertData((inputs, targets), SAMPLES)
+        self.assertData(load_dataset(self.filename, mmap_mode=None), SAMPLES)
+
+    def test_changed_size(self):
+        load_dataset(self.filename)
+
+        # Older than the cache, but not the file it was made from
+        changed = SAMPLES + "[[1, 1, 1], [1, 1]]\n"
+        self.write(changed, os.path.getmtime(self.cached) - 100)
+        self.assertData(load_dataset(self.filename), changed)
+
+    def test_changed_time(self):
+        self.write(SAMPLES, 1000000000)
+        load_dataset(self.filename)
+
+        # Same size, other values
+        changed = SAMPLES.replace("0.5", "0.7")
+        self.write(changed, 1000000001)
+        self.assertData(load_dataset(self.filename), changed)
+
+    def test_broken_cache(self):
+        load_dataset(self.filename)
+        size = os.path.getsize(self.cached)
+
+        # In the array, in the .npy header, and in the key
+        for length in (size - 8, 70, 10):
+            with open(self.cached, 'r+b') as f:
+                f.truncate(length)
+
+            self.assertData(load_dataset(self.filename), SAMPLES)
+            self.assertEqual(os.path.getsize(self.cached), size)
+
+    def test_no_temporary_files_left(self):
+        load_dataset(self.filename)
+        self.assertEqual(sorted(os.listdir(self.directory)), ["learning.txt", "learning.txt.cache"])
+
+    def test_without_cache(self):
+        self.assertData(load_dataset(self.filename, cache=False), SAMPLES)
+        self.assertFalse(os.path.exists(self.cached))
+
+
+if __name__ == "__main__":
+    unittest.main()
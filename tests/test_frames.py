@@ -0,0 +1,99 @@
+"""
+    Camera frames of FrameReader and EpuckBasic.get_frame.
+
+    Run from the top directory with: python -m unittest discover tests
+"""
+import unittest
+import numpy
+
+from controllers.webann import headless
+from controllers.webann.frames import FrameReader
+
+
+def images(count, height=4, width=5):
+    return numpy.arange(count * height * width * 3).reshape(count, height, width, 3).astype(numpy.uint8)
+
+
+class StubCamera(object):
+    """
+        Returns the images given as strings, a new string every call.
+    """
+
+    def __init__(self, images):
+        self.images = images
+        self.calls = 0
+        self.raw = None
+
+    def getWidth(self):
+        return self.images.shape[2]
+
+    def getHeight(self):
+        return self.images.shape[1]
+
+    def getImage(self):
+        self.raw = self.images[self.calls % len(self.images)].tostring()
+        self.calls += 1
+        return self.raw
+
+
+def shares(frame, raw):
+    # The str is at the end of the chain of views
+    base = frame
+    while isinstance(base, numpy.ndarray):
+        base = base.base
+    return base is raw
+
+
+class FrameReaderTest(unittest.TestCase):
+
+    def test_frame_wraps_camera_string(self):
+        camera = StubCamera(images(2))
+        reader = FrameReader(camera)
+
+        for expected in camera.images:
+            frame = reader.read()
+            self.assertEqual(frame.shape, (4, 5, 3))
+            self.assertEqual(frame.dtype, numpy.uint8)
+            self.assertTrue(numpy.array_equal(frame, expected))
+            self.assertTrue(shares(frame, camera.raw))
+
+    def test_buffer_is_reused(self):
+        camera = StubCamera(images(2))
+        reader = FrameReader(camera, buffer=True)
+
+        first = reader.read()
+        self.assertTrue(numpy.array_equal(first, camera.images[0]))
+        self.assertFalse(shares(first, camera.raw))
+
+        second = reader.read()
+        self.assertTrue(second is first)
+        self.assertTrue(numpy.array_equal(second, camera.images[1]))
+
+    def test_given_buffer(self):
+        camera = StubCamera(images(1))
+        buffer = numpy.zeros((4, 5, 3), dtype=numpy.uint8)
+
+        self.assertTrue(FrameReader(camera, buffer).read() is buffer)
+        self.assertTrue(numpy.array_equal(buffer, camera.images[0]))
+
+
+class GetFrameTest(unittest.TestCase):
+
+    def test_get_frame(self):
+        expected = images(3)
+        headless.install(headless.Trace(numpy.zeros((3, 8)), expected))
+
+        from controllers.webann.epuck_basic import EpuckBasic
+
+        robot = EpuckBasic()
+        robot.basic_setup()
+        camera = robot.getCamera('camera')
+
+        frame = robot.get_frame()
+        self.assertEqual(frame.shape, (4, 5, 3))
+        self.assertTrue(numpy.array_equal(frame, expected[0]))
+        self.assertTrue(shares(frame, camera.image))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+"""
+    EpuckBasic on the headless stand-in for the controller module.
+
+    Run from the top directory with: python -m unittest discover tests
+"""
+import unittest
+
+from controllers.webann import headless
+
+
+class TimedActionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.world = headless.install(headless.World(timestep=32))
+
+        from controllers.webann.epuck_basic import EpuckBasic
+
+        self.robot = EpuckBasic()
+        self.robot.basic_setup()
+
+    def test_run_timestep(self):
+        self.robot.run_timestep(3)
+        self.assertEqual(self.robot.time, 3 * 32)
+
+    def test_move_wheels(self):
+        x, y = self.world.x, self.world.y
+        self.robot.move_wheels(1.0, 1.0, duration=0.32)
+
+        self.assertEqual(self.robot.time, 320)
+        self.assertTrue(self.robot.getLeftEncoder() > 0 and self.robot.getRightEncoder() > 0)
+        self.assertNotEqual((self.world.x, self.world.y), (x, y))
+
+    def test_backward(self):
+        self.robot.backward(duration=0.064)
+
+        self.assertEqual(self.robot.time, 64)
+        self.assertTrue(self.robot.getLeftEncoder() < 0 and self.robot.getRightEncoder() < 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+"""
+    Camera image features on pixel arrays.
+
+    Run from the top directory with: python -m unittest discover tests
+"""
+import unittest
+import warnings
+import numpy
+
+from controllers.webann.imagepro import column_avgs, process_pixels
+
+
+class ColumnAvgsTest(unittest.TestCase):
+
+    def test_band(self):
+        pixels = numpy.arange(10 * 4 * 3, dtype=numpy.uint8).reshape(10, 4, 3)
+        self.assertTrue(numpy.array_equal(column_avgs(pixels, 0.6, 0.4), pixels[4:6].mean(axis=0)))
+
+    def test_empty_band(self):
+        # The band from row 2 to row 1 of a 3 row image has no rows
+        pixels = numpy.full((3, 10, 3), 200, dtype=numpy.uint8)
+        pixels[..., 0] = 0
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            avgs = column_avgs(pixels, 0.6, 0.4)
+            features = process_pixels(pixels, 5, 'green')
+
+        self.assertTrue(numpy.array_equal(avgs, numpy.zeros((10, 3))))
+        self.assertEqual(features, [0.0] * 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+"""
+    Incremental recall of CompiledAnn against full recall.
+
+    Run from the top directory with: python -m unittest discover tests
+"""
+import unittest
+import numpy
+
+from controllers.webann.ann.parser import AnnParser
+from tests.test_compiled import SCRIPT, recurrent_network
+
+
+def levels(engine):
+    return [(cl.membrane_potential.copy(), cl.activation_level.copy(), cl.prev_activation_level.copy(),
+             cl.layer.settling_rounds) for cl in engine.execution_order]
+
+
+class IncrementalTest(unittest.TestCase):
+
+    def compare(self, build, samples):
+        """
+            Recalls the samples with a full and an incremental engine
+            on two copies of a network. Returns the layers skipped by
+            every incremental recall.
+        """
+        full, incremental = build().compile(), build().compile(incremental=True)
+
+        skipped = []
+        for x in samples:
+            self.assertEqual(incremental.recall(x), full.recall(x))
+
+            for a, b in zip(levels(incremental), levels(full)):
+                for level, expected in zip(a[:3], b[:3]):
+                    self.assertTrue(numpy.array_equal(level, expected))
+                self.assertEqual(a[3], b[3])
+
+            skipped.append(incremental.skipped)
+        return skipped
+
+    def test_script(self):
+        def build():
+            ann = AnnParser(SCRIPT).create_ann()
+            ann.init_nodes()
+            return ann
+
+        random = numpy.random.RandomState(1)
+        samples, changes = [random.rand(13)], [None]
+        for i in range(20):
+            x = samples[-1].copy()
+            change = ("same", "distance", "camera", "all")[i % 4]
+            if change == "distance":
+                x[:8] = random.rand(8)
+            elif change == "camera":
+                x[8:] = random.rand(5)
+            elif change == "all":
+                x = random.rand(13)
+            samples.append(x)
+            changes.append(change)
+
+        skipped = self.compare(build, samples)
+
+        # The same input skips every layer but the inputs, and a camera
+        # change skips at least the Blocker layer, which only reads distances
+        for change, count in zip(changes, skipped):
+            if change == "same":
+                self.assertEqual(count, 3)
+            elif change == "camera":
+                self.assertTrue(count >= 1)
+
+    def test_recurrent(self):
+        ann = recurrent_network()
+        x = numpy.random.RandomState(1).rand(3, len(ann.input_nodes))
+        self.compare(recurrent_network, [x[0], x[0], x[1], x[1], x[1], x[2], x[0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+"""
+    Sparse link kernels against dense ones.
+
+    Run from the top directory with: python -m unittest discover tests
+"""
+import unittest
+import numpy
+
+from controllers.webann.ann.layer import Layer, Activation
+from controllers.webann.ann.link import Link
+from controllers.webann.ann.kernels import DenseKernel, SparseKernel
+
+
+def link(topology, pre=7, post=5, seed=0):
+    numpy.random.seed(seed)
+    link = Link(Layer("Pre", pre), Layer("Post", post, Activation.sigmoid_tanh), topology, arc_range=[-1, 1])
+    link.generate_arcs()
+    return link
+
+
+class KernelTest(unittest.TestCase):
+
+    def assertClose(self, a, b):
+        self.assertEqual(numpy.shape(a), numpy.shape(b))
+        self.assertTrue(numpy.allclose(a, b, rtol=0, atol=1e-12))
+
+    def compare(self, link, arcs=None):
+        dense, sparse = DenseKernel(link, arcs), SparseKernel(link, arcs)
+        random = numpy.random.RandomState(1)
+        pre, post = dense.shape[1], dense.shape[0]
+
+        for shape in ((), (4,)):
+            levels = random.rand(*shape + (pre,))
+            deltas = random.rand(*shape + (post,))
+
+            self.assertClose(sparse.forward(levels), dense.forward(levels))
+            self.assertClose(sparse.backward(deltas), dense.backward(deltas))
+
+            # Into a buffer with old values
+            for kernel in (dense, sparse):
+                out = numpy.full(shape + (post,), 7.0)
+                self.assertTrue(kernel.forward(levels, out) is out)
+                self.assertClose(out, dense.forward(levels))
+
+            self.assertClose(sparse.gradient(deltas, levels), dense.gradient(deltas, levels))
+
+        # New weights, through build
+        link.current_weights[:] = random.uniform(-1, 1, len(link.current_weights))
+        dense.build()
+        sparse.build()
+        levels = random.rand(pre)
+        self.assertClose(sparse.forward(levels), dense.forward(levels))
+
+    def test_full(self):
+        self.compare(link('full'))
+
+    def test_stochastic(self):
+        # Some nodes have no arcs at all
+        l = link('stochastic', 3, 30)
+        self.assertTrue(len(numpy.unique(l.post_index)) < 30)
+        self.compare(l)
+
+    def test_repeated_arcs(self):
+        l = link('full')
+        l.set_arcs([0, 0, 3, 6, 0], [1, 1, 4, 0, 1], [0.5, -0.25, 1.0, 2.0, 0.125])
+        self.compare(l)
+
+    def test_arc_subset(self):
+        l = link('triangulate', 6, 6)
+        self.compare(l, numpy.flatnonzero(l.pre_index < l.post_index))
+
+    def test_no_arcs(self):
+        l = link('full')
+        l.set_arcs([], [], [])
+        self.compare(l)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+    Control loop latency of WebAnn.run.
+
+    Run from the top directory with: python -m unittest discover tests
+"""
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from array import array
+
+from controllers.webann import headless, latency as latency_module
+from controllers.webann.latency import LoopLatency
+
+SCRIPT = os.path.join(os.path.dirname(__file__), "..", "controllers", "webann", "ann", "scripts", "ann.ini")
+
+
+class FakeClock(object):
+    """
+        A clock that moves a microsecond every time it is read, and
+        more when told to.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 1e-6
+        return self.now
+
+
+class LoopLatencyTest(unittest.TestCase):
+
+    def latency(self, ticks):
+        # Tick times in seconds, as stop() would record them
+        latency = LoopLatency(32)
+        latency.ticks = array('d', ticks)
+        return latency
+
+    def test_histogram_keeps_every_tick(self):
+        # Far below the first bin, and far over ten timesteps
+        latency = self.latency([1e-7, 0.0002, 0.05, 3.0])
+        counts, edges = latency.histogram()
+
+        self.assertEqual(counts.sum(), 4)
+        self.assertTrue(edges[-1] >= 3000)
+        self.assertEqual(counts[-1], 1)
+
+    def test_given_bins(self):
+        # 0.1, 2, 500 and 3000 ms, the last two over the last edge
+        counts, edges = self.latency([0.0001, 0.002, 0.5, 3.0]).histogram(bins=[0.01, 1, 10])
+        self.assertEqual(counts.tolist(), [1, 3])
+
+    def test_overruns(self):
+        latency = LoopLatency(10, stages=('work',))
+        for seconds in (0.001, 0.02):
+            latency.start()
+            latency.begin -= seconds # as if the stage took that long
+            latency.lap('work')
+            latency.stop()
+
+        self.assertEqual(latency.overruns, 1)
+        result = json.loads(latency.to_json())
+        self.assertEqual(result['ticks'], 2)
+        self.assertEqual(sum(result['tick']['histogram']['counts']), 2)
+
+
+
+class WebAnnRunTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.clock = latency_module.clock
+        latency_module.clock = FakeClock()
+
+    def tearDown(self):
+        latency_module.clock = self.clock
+        shutil.rmtree(self.directory)
+
+    def test_run(self):
+        headless.install(headless.World.random(4, seed=0, steps=10))
+
+        from controllers.webann import webann
+        from controllers.webann.ann.parser import AnnParser
+
+        clock = latency_module.clock
+
+        class Controller(webann.WebAnn):
+
+            def drive_speed(self, left=0, right=0):
+                webann.WebAnn.drive_speed(self, left, right)
+
+                # Ticks 3 and 7 take 50 ms to drive, over the 32 ms timestep
+                if len(self.latency.ticks) in (3, 7):
+                    clock.now += 0.050
+
+        filename = os.path.join(self.directory, "latency.json")
+        controller = Controller(AnnParser(SCRIPT).create_ann(), latency_file=filename)
+        controller.run()
+
+        latency = controller.latency
+        ticks = len(latency.ticks)
+        self.assertEqual(ticks, 11) # the last step ends the run
+        for stage in LoopLatency.stages:
+            self.assertEqual(len(latency.samples[stage]), ticks)
+
+        self.assertEqual(latency.overruns, 2)
+        self.assertTrue(latency.times('drive').max() >= 50)
+        self.assertTrue(latency.times('recall').max() < 1)
+
+        result = json.load(open(filename))
+        self.assertEqual((result['ticks'], result['overruns']), (ticks, 2))
+        for stage in LoopLatency.stages:
+            self.assertEqual(result['stages'][stage]['count'], ticks)
+            self.assertEqual(sum(result['stages'][stage]['histogram']['counts']), ticks)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+    Array versions of the learning rules against the rules arc by arc.
+
+    Run from the top directory with: python -m unittest discover tests
+"""
+import unittest
+import numpy
+from functools import partial
+
+from controllers.webann.ann.layer import Layer, Activation
+from controllers.webann.ann.link import Link, LearningRule
+
+
+def link(rule, seed=0):
+    numpy.random.seed(seed)
+    pre, post = Layer("Pre", 6), Layer("Post", 4, Activation.sigmoid_tanh)
+    post.set_learning_mode()
+
+    link = Link(pre, post, 'stochastic', arc_range=[-1, 1], learning_rate=0.3, learning_rule=rule)
+    link.generate_arcs()
+
+    random = numpy.random.RandomState(1)
+    pre.activation_levels[:] = random.uniform(-1, 1, 6)
+    post.activation_levels[:] = random.uniform(-1, 1, 4)
+    return link
+
+
+class LearningRuleTest(unittest.TestCase):
+
+    def compare(self, rule):
+        # Not registered, so Link.learn goes arc by arc
+        scalar = lambda arc, rate, pre, post: rule(arc, rate, pre, post)
+        self.assertTrue(LearningRule.kernel(scalar) is None)
+        self.assertTrue(LearningRule.kernel(rule) is not None)
+
+        array, arcs = link(rule), link(scalar)
+        for i in range(3):
+            array.learn()
+            arcs.learn()
+
+        self.assertTrue(numpy.allclose(array.current_weights, arcs.current_weights, rtol=0, atol=1e-12))
+        self.assertFalse(numpy.allclose(array.current_weights, array.initial_weights))
+
+    def test_hebbian(self):
+        self.compare(LearningRule.hebbian)
+
+    def test_general_hebb(self):
+        self.compare(LearningRule.general_hebb)
+
+    def test_general_hebb_threshold(self):
+        self.compare(partial(LearningRule.general_hebb, threshold=-0.2))
+
+    def test_oja(self):
+        self.compare(LearningRule.oja)
+
+
+if __name__ == "__main__":
+    unittest.main()
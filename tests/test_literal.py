@@ -0,0 +1,47 @@
+"""
+    List parsing of ANN scripts, against ast.literal_eval.
+"""
+import ast
+import unittest
+import numpy
+
+from controllers.webann.ann.literal import parse_array
+
+
+class ParseArrayTest(unittest.TestCase):
+
+    def assertParses(self, text):
+        expected = ast.literal_eval(text)
+        result = parse_array(text)
+        if isinstance(result, numpy.ndarray):
+            result = [tuple(r) for r in result.tolist()] if result.ndim == 2 else result.tolist()
+        self.assertEqual(result, expected)
+
+    def test_numbers(self):
+        for text in ("[1, 2, 3]", "[0.5, -1e-3, 2.]", "[-1, 1.5E2]", "[ 4 , 5 , ]", "[-0]"):
+            self.assertParses(text)
+
+    def test_integers(self):
+        self.assertEqual(parse_array("[1, -2, 3]").dtype, numpy.int64)
+        self.assertEqual(parse_array("[1, -2, 3.0]").dtype, numpy.float64)
+
+    def test_pairs(self):
+        for text in ("[(0, 1), (2, 3)]", "[(0.5, -1), (1e2, 2)]", "[(1, 2),]"):
+            self.assertParses(text)
+
+    def test_other_literals(self):
+        for text in ("['Input', 'Output']", "[(1, 2, 3)]", "[(1,)]", "[[1, 2], [3]]", "[99999999999999999999]",
+                     "[-99999999999999999999, 1]", "[(99999999999999999999, 1)]"):
+            self.assertParses(text)
+
+    def test_empty(self):
+        self.assertEqual(len(parse_array("[]")), 0)
+
+    def test_malformed(self):
+        for text in ("[-]", "[+]", "[.]", "[1, , 2]", "[,]", "[1 2]", "[1.2.3]", "[--1]", "[1-2]", "[1e]",
+                     "[(,)]", "[(, 1)]", "[(1, 2), (3, -)]", "[(1 2)]", "[(1, 2)(3, 4)]", "[1, 2"):
+            self.assertRaises(ValueError, parse_array, text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+"""
+    Data parallel training against single process training, and the
+    training jobs of train_networks.
+
+    Run from the top directory with: python -m unittest discover tests
+"""
+import os
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+import numpy
+
+from controllers.webann.ann import parallel
+from controllers.webann.ann.layer import Layer, Activation
+from controllers.webann.ann.link import Link
+from controllers.webann.ann.ann import Ann
+from controllers.webann.ann.dataset import load_dataset
+from controllers.webann.ann.training import BatchBackprop
+from controllers.webann.ann.parallel import DataParallelTrainer, _train_job
+from controllers.webann.ann.parser import AnnParser
+from tests.test_cache import RANDOM_SCRIPT
+
+DATA = os.path.join(os.path.dirname(__file__), "..", "controllers", "webann", "data", "learning.txt")
+
+XOR_INPUTS = numpy.array([[1, 1], [0, 0], [0, 1], [1, 0]], dtype=float)
+XOR_TARGETS = numpy.array([[-1], [-1], [1], [1]], dtype=float)
+
+
+def mlp(sizes, seed, learning_rate):
+    numpy.random.seed(seed)
+
+    layers = [Layer("Input", sizes[0], io_type='encoder')]
+    for i, n in enumerate(sizes[1:]):
+        io_type = 'decoder' if i == len(sizes) - 2 else None
+        layers.append(Layer("L%i" % (i + 1), n, Activation.sigmoid_tanh, io_type=io_type))
+
+    links = [Link(layers[i], layers[i + 1], 'full', arc_range=[-0.5, 0.5], learning_rate=learning_rate)
+                for i in range(len(layers) - 1)]
+
+    ann = Ann(layers, links, [l.name for l in layers])
+    ann.init_nodes()
+    return ann
+
+
+class DataParallelTest(unittest.TestCase):
+
+    def compare(self, sizes, inputs, targets, epochs, batch_size, workers, learning_rate):
+        single, parallel = mlp(sizes, 1, learning_rate), mlp(sizes, 1, learning_rate)
+
+        expected = BatchBackprop(single, batch_size).train(inputs, targets, epochs)
+        errors = DataParallelTrainer(parallel, workers, batch_size).train(inputs, targets, epochs)
+
+        self.assertTrue(numpy.allclose(errors, expected, rtol=1e-9, atol=1e-12))
+        for a, b in zip(single.links, parallel.links):
+            self.assertTrue(numpy.allclose(a.current_weights, b.current_weights, rtol=1e-9, atol=1e-12))
+
+        # And the training did something
+        self.assertTrue(expected[-1] < expected[0])
+
+    def test_xor(self):
+        self.compare((2, 3, 1), XOR_INPUTS, XOR_TARGETS, 100, None, 3, 0.5)
+
+    def test_learning_data(self):
+        inputs, targets = load_dataset(DATA, cache=False)
+        inputs, targets = inputs[:300], targets[:300]
+        self.compare((inputs.shape[1], 6, targets.shape[1]), inputs, targets, 5, 64, 3, 0.2)
+
+    def test_dead_worker(self):
+        worker = parallel._data_parallel_worker
+
+        def dying(ann, inputs, targets, shared_weights, shared_deltas, slot, conn):
+            if slot == 1:
+                conn.recv()
+                os._exit(1)
+            worker(ann, inputs, targets, shared_weights, shared_deltas, slot, conn)
+
+        # The workers are forked, and run the replaced function
+        parallel._data_parallel_worker = dying
+        try:
+            trainer = DataParallelTrainer(mlp((2, 3, 1), 1, 0.5), 3)
+            self.assertRaises(EOFError, trainer.train, XOR_INPUTS, XOR_TARGETS, 10)
+        finally:
+            parallel._data_parallel_worker = worker
+
+        self.assertEqual(multiprocessing.active_children(), [])
+
+
+class TrainJobTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_workers_draw_their_own_weights(self):
+        script = os.path.join(self.directory, "random.ini")
+        with open(script, 'w') as f:
+            f.write(RANDOM_SCRIPT)
+        AnnParser(script).create_ann(cache=True)
+
+        data = os.path.join(self.directory, "data.txt")
+        with open(data, 'w') as f:
+            f.write("[[0, 0, 0, 0], [0, 0, 0]]\n" * 10)
+
+        # Reseeded per worker, with a cache there from an earlier run
+        results = [_train_job((i, script, data, 1, 1, {})) for i in range(2)]
+        self.assertFalse(all(numpy.array_equal(x, y) for x, y in zip(results[0]['weights'], results[1]['weights'])))
+
+
+if __name__ == "__main__":
+    unittest.main()
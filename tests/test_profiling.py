@@ -0,0 +1,63 @@
+"""
+    Settling rounds in the Profiler of an Ann.
+
+    Run from the top directory with: python -m unittest discover tests
+"""
+import unittest
+import numpy
+
+from controllers.webann.ann.layer import Layer, Activation
+from controllers.webann.ann.link import Link
+from controllers.webann.ann.ann import Ann
+from controllers.webann.ann.ann_modules import Competitive
+
+
+def network():
+    numpy.random.seed(0)
+
+    source = Layer("Input", 10, io_type='encoder')
+    target = Layer("Output", 2, Activation.sigmoid_log, io_type='decoder')
+
+    competitive = Competitive("Hidden", 6, Activation.sigmoid_log, neg=-0.3, pos=0.5,
+        up=Link(source, None, 'full', arc_range=[-0.2, 0.25]),
+        down=Link(None, target, 'full', arc_range=[-1, 1]),
+        rounds=10, tolerance=1e-6)
+
+    ann = Ann([source, competitive, target], [], ["Input", "Hidden", "Output"])
+    ann.init_nodes()
+    return ann, competitive
+
+
+class SettleTest(unittest.TestCase):
+
+    def check_rounds(self, ann, layer):
+        ann.enable_profiling()
+        rounds = 0
+        for x in numpy.random.RandomState(1).rand(5, 10):
+            ann.recall(x)
+            rounds += layer.settling_rounds
+
+        stats = ann.profiler.stats
+        settle = [(item[1], entry) for (kind, item), entry in stats.items() if kind == "settle"]
+        update = stats[("update", layer)]
+
+        # One call per round, numbered from 1
+        self.assertEqual(sum(entry[1] for round, entry in settle), rounds)
+        self.assertEqual(sorted(round for round, entry in settle), range(len(settle)))
+        self.assertEqual(dict(settle)[0][0], "Hidden round 1")
+
+        # The rounds are timed inside the update, not as the whole update
+        self.assertTrue(sum(entry[2] for round, entry in settle) <= update[2])
+
+    def test_graph_rounds(self):
+        ann, layer = network()
+        self.check_rounds(ann, layer)
+
+    def test_compiled_rounds(self):
+        ann, layer = network()
+        ann.compile()
+        self.check_rounds(ann, layer)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+    Binary weight snapshots: export with a snapshot, reload through the
+    INI snapshot key, and restore.
+
+    Run from the top directory with: python -m unittest discover tests
+"""
+import os
+import shutil
+import tempfile
+import unittest
+import numpy
+
+from controllers.webann.ann.layer import Layer, Activation
+from controllers.webann.ann.link import Link
+from controllers.webann.ann.ann import Ann
+from controllers.webann.ann.parser import AnnParser
+from controllers.webann.ann.snapshot import Snapshot, save_snapshot
+
+
+def network(seed=0):
+    """
+        Random arcs and weights, with an intra layer and a recurrent
+        link. The current weights differ from the initial ones.
+    """
+    numpy.random.seed(seed)
+
+    source = Layer("Input", 5, io_type='encoder')
+    hidden = Layer("Hidden", 6, Activation.sigmoid_tanh)
+    target = Layer("Output", 4, Activation.sigmoid_tanh, io_type='decoder')
+
+    links = [Link(source, hidden, 'full', arc_range=[-1, 1]),
+             Link(hidden, hidden, 'stochastic', arc_range=[-0.2, 0.2]),
+             Link(target, hidden, 'full', arc_range=[-0.2, 0.2]),
+             Link(hidden, target, 'full', arc_range=[-1, 1])]
+
+    ann = Ann([source, hidden, target], links, ["Input", "Hidden", "Output"])
+    ann.init_nodes()
+
+    for link in ann.links:
+        link.current_weights += numpy.random.uniform(-0.1, 0.1, len(link.current_weights))
+    return ann
+
+
+def mapped(array):
+    while array is not None:
+        if isinstance(array, numpy.memmap):
+            return True
+        array = array.base
+    return False
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.script = os.path.join(self.directory, "ann.ini")
+        self.snapshot = os.path.join(self.directory, "weights", "ann.snap")
+        os.mkdir(os.path.dirname(self.snapshot))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def reload(self, script=None):
+        ann = AnnParser(script or self.script).create_ann()
+        ann.init_nodes()
+        return ann
+
+    def assertLinks(self, ann, expected, current, initial):
+        self.assertEqual(len(ann.links), len(expected.links))
+
+        for link, other in zip(ann.links, expected.links):
+            self.assertTrue(numpy.array_equal(link.pre_index, other.pre_index))
+            self.assertTrue(numpy.array_equal(link.post_index, other.post_index))
+            self.assertTrue(numpy.array_equal(link.current_weights, getattr(other, current)))
+            self.assertTrue(numpy.array_equal(link.initial_weights, getattr(other, initial)))
+
+    def test_export_initial_weights(self):
+        ann = network()
+        AnnParser.export(ann, self.script, snapshot=self.snapshot)
+
+        self.assertLinks(self.reload(), ann, 'initial_weights', 'initial_weights')
+
+    def test_export_updated_weights(self):
+        ann = network()
+        AnnParser.export(ann, self.script, use_updated_values=True, snapshot=self.snapshot)
+
+        reloaded = self.reload()
+        self.assertLinks(reloaded, ann, 'current_weights', 'current_weights')
+
+        x = numpy.random.RandomState(1).rand(5)
+        self.assertTrue(numpy.array_equal(reloaded.recall(x), ann.recall(x)))
+
+    def test_reload_is_mapped(self):
+        ann = network()
+        AnnParser.export(ann, self.script, use_updated_values=True, snapshot=self.snapshot)
+        reloaded = self.reload()
+
+        for link, other in zip(reloaded.links, ann.links):
+            for array in (link.pre_index, link.post_index, link.current_weights, link.initial_weights):
+                self.assertTrue(mapped(array))
+
+            # Copy on write, and the initial weights are apart
+            link.current_weights[:] = 0
+            self.assertTrue(numpy.array_equal(link.initial_weights, other.current_weights))
+
+        self.assertLinks(self.reload(), ann, 'current_weights', 'current_weights')
+
+    def test_export_reloaded_without_snapshot(self):
+        ann = network()
+        AnnParser.export(ann, self.script, snapshot=self.snapshot)
+
+        script = os.path.join(self.directory, "plain.ini")
+        AnnParser.export(self.reload(), script)
+        with open(script) as f:
+            self.assertFalse("snapshot" in f.read())
+
+        self.assertLinks(self.reload(script), ann, 'initial_weights', 'initial_weights')
+
+    def test_restore(self):
+        ann = network()
+        save_snapshot(ann, self.snapshot)
+
+        # Initialised with other weights, and not initialised at all
+        other = network(seed=1)
+        Snapshot(self.snapshot).restore(other)
+        self.assertLinks(other, ann, 'current_weights', 'initial_weights')
+
+        AnnParser.export(ann, self.script)
+        fresh = AnnParser(self.script).create_ann()
+        Snapshot(self.snapshot).restore(fresh)
+        self.assertLinks(fresh, ann, 'current_weights', 'initial_weights')
+        self.assertTrue(all(mapped(link.current_weights) for link in fresh.links))
+
+
+if __name__ == "__main__":
+    unittest.main()
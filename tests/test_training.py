@@ -0,0 +1,88 @@
+"""
+    BatchBackprop against Ann.backprop of one sample at a time.
+
+    Run from the top directory with: python -m unittest discover tests
+"""
+import unittest
+import numpy
+
+from controllers.webann.ann.layer import Layer, Activation
+from controllers.webann.ann.link import Link
+from controllers.webann.ann.ann import Ann
+from controllers.webann.ann.training import BatchBackprop
+
+
+def mlp(seed=0):
+    # A chain: Ann.backprop applies the derivative of a layer once for
+    # every link entering it, so layers with more links differ
+    numpy.random.seed(seed)
+
+    layers = [Layer("Input", 3, io_type='encoder'),
+              Layer("L1", 5, Activation.sigmoid_log),
+              Layer("L2", 4, Activation.sigmoid_tanh),
+              Layer("Output", 2, Activation.sigmoid_tanh, io_type='decoder')]
+
+    links = [Link(layers[0], layers[1], 'full', arc_range=[-1, 1], learning_rate=0.3),
+             Link(layers[1], layers[2], 'full', arc_range=[-1, 1], learning_rate=0.2),
+             Link(layers[2], layers[3], 'full', arc_range=[-1, 1], learning_rate=0.1)]
+
+    ann = Ann(layers, links, [l.name for l in layers])
+    ann.init_nodes()
+    ann.set_learning_mode()
+    return ann
+
+
+def data(count=6):
+    random = numpy.random.RandomState(1)
+    return random.uniform(-1, 1, (count, 3)), random.uniform(-0.8, 0.8, (count, 2))
+
+
+def weights(ann):
+    return [link.current_weights.copy() for link in ann.links]
+
+
+class BatchBackpropTest(unittest.TestCase):
+
+    def assertSameWeights(self, a, b):
+        for x, y in zip(a, b):
+            self.assertTrue(numpy.allclose(x, y, rtol=0, atol=1e-12))
+
+    def test_incremental(self):
+        inputs, targets = data()
+        single, batch = mlp(), mlp()
+
+        for x, t in zip(inputs, targets):
+            single.backprop(x, t.tolist())
+        errors = BatchBackprop(batch, 1).train(inputs, targets)
+
+        self.assertSameWeights(weights(batch), weights(single))
+        self.assertFalse(all(numpy.array_equal(a, b) for a, b in zip(weights(batch), weights(mlp()))))
+        self.assertEqual(len(errors), 1)
+
+    def test_batch_is_mean_of_samples(self):
+        inputs, targets = data()
+        single, batch = mlp(), mlp()
+        start = weights(single)
+
+        # The change of every sample from the same weights
+        changes = []
+        for x, t in zip(inputs, targets):
+            for link, w in zip(single.links, start):
+                link.current_weights[:] = w
+            for layer in single.layers:
+                layer.reset_levels()
+
+            single.backprop(x, t.tolist())
+            changes.append([w - s for w, s in zip(weights(single), start)])
+
+        expected = [s + numpy.mean(c, axis=0) for s, c in zip(start, zip(*changes))]
+
+        error = BatchBackprop(batch, None).step(inputs, targets)
+        self.assertSameWeights(weights(batch), expected)
+
+        outputs = numpy.array([mlp().recall(x) for x in inputs])
+        self.assertAlmostEqual(error, ((targets - outputs) ** 2).sum())
+
+
+if __name__ == "__main__":
+    unittest.main()